@@ -163,9 +163,12 @@ class cliffordGroup(GateGroup):
         if check:
             assert self.check_seq(indexseq)
         pi_len, pi_factor, half_pi_len, half_pi_factor = pi_array
-        res_wd=Wavedata(sRate=sRate)
+        builder=WavedataBuilder(sRate)
         buffer_wd=Blank(buffer,sRate)
+        XY_dict={} # 相同索引的脉冲只生成一次
         for v in indexseq:
-            XY_wd=self.gen_XY(v,pi_len,pi_factor,half_pi_len,half_pi_factor,sRate,TYPE)
-            res_wd=res_wd|XY_wd|buffer_wd
+            if v not in XY_dict:
+                XY_dict[v]=self.gen_XY(v,pi_len,pi_factor,half_pi_len,half_pi_factor,sRate,TYPE)
+            builder.append(XY_dict[v]).append(buffer_wd)
+        res_wd=builder.build()
         return res_wd
@@ -3,12 +3,16 @@
 import numpy as np
 import copy
 import matplotlib.pyplot as plt
-from ._wavedata import Wavedata
+from ._wavedata import Wavedata, WavedataN
+from ._dense import DenseWavedataN
 from ._wd_func import *
 from . import _Filter as F
+from . import _process as p
+from ._cache import LRUCache
+from ._NCO import carrier
 
 __all__ = ['Analyze_cali', 'Calibrate', 'Homodyne', 'filterGenerator', 'Demodulation', 
-    'dataMask', 'wdMask']
+    'Channelize', 'DemodMatrix', 'IQExtract', 'dataMask', 'wdMask']
 
 def Analyze_cali(wd, freq=50e6, **kw):
     '''计算IQ波形的校正序列，准确性很好
@@ -19,31 +23,39 @@ def Analyze_cali(wd, freq=50e6, **kw):
     Return:
         cali_array: 2*3的序列，包含校正信息
     '''
-    para_I=wd.I().getFFT([0,freq],mode='complex',half=False)
-    para_Q=wd.Q().getFFT([0,freq],mode='complex',half=False)
+    return _cali_batch(wd, [freq])[0]
+
+def _cali_batch(wd, freqlist):
+    '''一次计算多个频率的校正序列，返回 (len(freqlist), 2, 3) 的数组'''
+    # I/Q一起计算，只计算0频和各freq频率分量
+    data_IQ=np.array([np.real(wd.data),np.imag(wd.data)])
+    para_I,para_Q=p.getFFT(data_IQ,wd.sRate,np.append(0,freqlist),mode='complex',half=False,method='dft')
 
     _offset_I,_offset_Q = para_I[0].real,para_Q[0].real
-    amp_I,amp_Q = np.abs(para_I[1]),np.abs(para_Q[1])
-    phase_I,phase_Q = np.angle(para_I[1],deg=True),np.angle(para_Q[1],deg=True)
+    amp_I,amp_Q = np.abs(para_I[1:]),np.abs(para_Q[1:])
+    phase_I,phase_Q = np.angle(para_I[1:],deg=True),np.angle(para_Q[1:],deg=True)
 
-    _scale_I, _scale_Q = 1, amp_Q/amp_I
+    _scale_I, _scale_Q = np.ones_like(amp_I), amp_Q/amp_I
     phi0 = 90
     # 相位范围转化为（-180，180）
-    _phase_I, _phase_Q = 0, (phase_Q-phase_I+phi0+540)%360-180
+    _phase_I, _phase_Q = np.zeros_like(amp_I), (phase_Q-phase_I+phi0+540)%360-180
 
-    cali_array = np.array([[_scale_I,_offset_I,_phase_I],
-                           [_scale_Q,_offset_Q,_phase_Q]]
-                          ).round(decimals=3) # 保留3位小数
+    _offset_I = np.full_like(amp_I, _offset_I)
+    _offset_Q = np.full_like(amp_I, _offset_Q)
+    cali_array = np.stack([np.stack([_scale_I,_offset_I,_phase_I],axis=-1),
+                           np.stack([_scale_Q,_offset_Q,_phase_Q],axis=-1)],
+                          axis=1).round(decimals=3) # 保留3位小数
     return cali_array
 
 
-def Calibrate(wd, freq=50e6, cali=None, **kw):
+def Calibrate(wd, freq=50e6, cali=None, method='fft', **kw):
     '''校正波形
 
     Parameters:
         wd: 包含IQ信息的Wavedata类实例
         freq: 校正的频率标准
         cali: 2*3的序列，包含校正信息，可用Analyze_cali得到
+        method: 相位校准的时移方法，参考Wavedata.fractional_shift
     Return:
         _wd: 校正后的wd
     '''
@@ -60,11 +72,9 @@ def Calibrate(wd, freq=50e6, cali=None, **kw):
         shift_I = _phi_I/(2*np.pi*freq) if not freq==0 else 0
         shift_Q = _phi_Q/(2*np.pi*freq) if not freq==0 else 0
 
-        # 相位校准，将I/Q插值函数平移后重新采样
-        func_I = lambda x: wd.I().timeFunc(kind='cubic')(x-shift_I)
-        _wd_I = Wavedata.init(func_I,(0,wd.len),wd.sRate)
-        func_Q = lambda x: wd.Q().timeFunc(kind='cubic')(x-shift_Q)
-        _wd_Q = Wavedata.init(func_Q,(0,wd.len),wd.sRate)
+        # 相位校准，将I/Q分别延时shift
+        _wd_I = wd.I().fractional_shift(shift_I, method=method)
+        _wd_Q = wd.Q().fractional_shift(shift_Q, method=method)
 
         # 反向校准，与vIQmixer中carry_wave校准相反
         _wd_I=(_wd_I-_offset_I)/_scale_I
@@ -88,7 +98,7 @@ def Homodyne(wd, freq=50e6, cali=None, **kw):
         _wd = wd
     else:
         _wd = Calibrate(wd, freq=freq, cali=cali, **kw)
-    res_wd=_wd*Exp(-2*np.pi*freq,0,wd.len,wd.sRate)
+    res_wd=_wd*Wavedata(carrier(-freq,wd.size,wd.sRate),wd.sRate)
     return res_wd
 
 
@@ -126,44 +136,202 @@ def Demodulation(wd_raw,freqlist,bandwidth=1e6):
         wd_f = Homodyne(wd_cali, freq=f, cali=None).convolve(gk)
         yield wd_f
 
-def dataMask(data,extend=0):
-    '''获取数据的掩模
+def Channelize(wd,freqlist,bandwidth=1e6,decimate=1,cali=None,flt=None):
+    '''多频率同时解调，所有频率的载波一起混频得到 (频率数, 点数) 的二维数组，再一次批量低通滤波
+
+    Parameters：
+        wd: Wavedata类，待解调wd
+        freqlist: 解调频率列表，正负表示不同的解调方向(与Homodyne相同)
+        bandwidth: 解调滤波的带宽，默认低通滤波器的截止频率为bandwidth/2
+        decimate: 整数，滤波后的抽取倍数，取每组中间的点
+        cali: 校正信息，None不校正；'auto'对每个频率用Analyze_cali的方法计算；
+            也可以传入 (2,3) 或 (频率数,2,3) 的数组
+        flt: 低通滤波器，默认为与filterGenerator同类型的二阶椭圆低通滤波器
+
+    Return:
+        DenseWavedataN，每行为对应频率解调后的波形
+
+    校正的相位误差在混频后等效为每个频率的相位因子，忽略了解调结果亚采样点的时移
+    '''
+    freqs=np.atleast_1d(np.asarray(freqlist,dtype=float))
+    sRate=wd.sRate
+    data=wd.data
+    _carrier=np.array([carrier(-f,wd.size,sRate) for f in freqs])
+    if flt is None:
+        flt=F.IIRFilter(2, bandwidth/2, 0.01, 100, 'low', ftype='ellip', fs=sRate)
+    if cali is None:
+        res,_=flt.process(data*_carrier,sRate,axis=-1)
+    else:
+        if isinstance(cali,str) and cali == 'auto':
+            _cali=_cali_batch(wd,freqs)
+        else:
+            _cali=np.broadcast_to(np.asarray(cali,dtype=float),(freqs.size,2,3))
+        _scale,_offset=_cali[:,:,0],_cali[:,:,1]
+        _phi=np.where(freqs[:,None]==0,0,_cali[:,:,2]*np.pi/180)
+        # I/Q分别混频滤波，相位校准(时移)等效为乘以相位因子
+        res_I,_=flt.process((np.real(data)-_offset[:,0,None])*_carrier,sRate,axis=-1)
+        res_Q,_=flt.process((np.imag(data)-_offset[:,1,None])*_carrier,sRate,axis=-1)
+        res=(res_I*(np.exp(-1j*_phi[:,0])/_scale[:,0])[:,None]
+             +1j*res_Q*(np.exp(-1j*_phi[:,1])/_scale[:,1])[:,None])
+    q=int(decimate)
+    if q > 1:
+        res=res[:,(q-1)//2::q]
+        sRate=sRate/q
+    return DenseWavedataN(res,sRate)
+
+def _shots(data,sRate=None):
+    '''把多发数据转化为 (发数, 点数) 的二维数组，返回 (数组, 采样率)；
+    各发点数必须相同，补0会使较短的发按补0后的点数归一化，结果偏小'''
+    if isinstance(data,WavedataN):
+        data=data.dense()
+        assert data.isUniform, 'All shots must have the same length!'
+        return data.data,data.sRate
+    elif isinstance(data,Wavedata):
+        return data.data[None,:],data.sRate
+    return np.atleast_2d(data),sRate
+
+_demod_cache = LRUCache(maxsize=16, maxbytes=2**26)
+
+def DemodMatrix(freqlist,size,sRate,weights=None,window=None):
+    '''生成单发IQ提取的解调矩阵 (点数, 频率数)，数据与之矩阵相乘即得到各频率的积分IQ
+
+    Parameters：
+        freqlist: 解调频率列表，正负表示不同的解调方向(与Homodyne相同)
+        size: 每发数据的点数
+        sRate: 采样率
+        weights: 积分权重，形状为 (点数,) 或 (频率数, 点数)，可以为复数
+        window: (start, stop) 积分时间窗口，单位与采样率对应
+
+    Return:
+        解调矩阵，结果按权重绝对值之和归一化，不加权重时等于解调后波形的平均值；
+        不指定weights时结果会被缓存，返回只读数组
+    '''
+    freqs=np.atleast_1d(np.asarray(freqlist,dtype=float))
+    key=None
+    if weights is None:
+        key=(tuple(freqs),int(size),sRate,None if window is None else tuple(window))
+        matrix=_demod_cache.get(key)
+        if matrix is not None:
+            return matrix
+    t=(np.arange(size)+0.5)/sRate
+    w=np.ones((1,size)) if weights is None else np.atleast_2d(weights)
+    if window is not None:
+        start,stop=window
+        w=w*((t>=start)&(t<stop))
+    w=np.broadcast_to(w,(freqs.size,size))
+    norm=np.sum(np.abs(w),axis=1,keepdims=True)
+    # 解调矩阵本身已被缓存，载波不再重复缓存
+    _carrier=carrier(-freqs,size,sRate,cache=False)
+    matrix=(w/np.where(norm==0,1,norm)*_carrier).T
+    if key is not None:
+        matrix.flags.writeable=False
+        _demod_cache.put(key,matrix)
+    return matrix
+
+def IQExtract(data,freqlist=None,sRate=None,weights=None,window=None,matrix=None):
+    '''单发IQ提取，一次矩阵乘法得到每发数据各个频率的积分IQ
+
+    Parameters：
+        data: (发数, 点数) 的数组，或WavedataN/DenseWavedataN/Wavedata(各波形点数和采样率相同)
+        freqlist: 解调频率列表
+        sRate: 采样率，data为数组时需要指定
+        weights, window: 积分权重和时间窗口，参考DemodMatrix
+        matrix: 预先用DemodMatrix生成的解调矩阵，指定时忽略freqlist等参数
+
+    Return:
+        (发数, 频率数) 的复数数组；data为Wavedata时返回 (频率数,) 的数组
+    '''
+    single=isinstance(data,Wavedata)
+    data,sRate=_shots(data,sRate)
+    if matrix is None:
+        matrix=DemodMatrix(freqlist,data.shape[-1],sRate,weights,window)
+    # 单精度数据用单精度矩阵计算，避免数据被整体转化为双精度
+    matrix=matrix.astype(np.result_type(data.dtype,np.complex64),copy=False)
+    if np.iscomplexobj(data):
+        res=data@matrix
+    else: # 实数数据分别与实部虚部相乘，避免把数据转化为复数
+        res=data@matrix.real+1j*(data@matrix.imag)
+    return res[0] if single else res
+
+def _intervals(mask):
+    '''掩模中为1的区间列表 [(start, stop), ...]，多维数组时沿最后一维，返回嵌套列表'''
+    mask=np.atleast_1d(mask)
+    rows=mask.reshape((int(np.prod(mask.shape[:-1])),mask.shape[-1]))
+    pad=np.zeros((rows.shape[0],1),dtype=rows.dtype)
+    edge=np.diff(np.concatenate([pad,rows,pad],axis=-1),axis=-1)
+    # 所有行的边沿一次找出，再按行号分组
+    r0,starts=np.nonzero(edge==1)
+    _,stops=np.nonzero(edge==-1)
+    bounds=np.searchsorted(r0,np.arange(rows.shape[0]+1))
+    res=[list(zip(starts[a:b].tolist(),stops[a:b].tolist())) for a,b in zip(bounds[:-1],bounds[1:])]
+    if mask.ndim == 1:
+        return res[0]
+    out=np.empty(len(res),dtype=object)
+    out[:]=res
+    return out.reshape(mask.shape[:-1]).tolist()
+
+def dataMask(data,extend=0,intervals=False):
+    '''获取数据的掩模，用累积和计算窗口内非零点的个数，耗时与extend无关
 
     Parameters:
-        data: 一维数列或np.ndarray
-        extend: 掩模扩展的点数(一侧)，正数向外扩展，负数向内收缩
+        data: 一维数列或np.ndarray，多维数组时沿最后一维处理
+        extend: 掩模扩展的点数(一侧)，正数向外扩展，负数向内收缩(数据范围之外视为0)
+        intervals: 为True时同时返回掩模为1的区间列表 [(start, stop), ...]，
+            多维数组时返回与其它维对应的嵌套列表
     
     Return:
         掩模数据(np.ndarray)，为0或1的二值序列
     '''
-    data=np.array(data)
-    maskdata=np.where(data==0,0,1)
-    if extend != 0:
-        size=int(abs(extend))*2+1
-        k=np.ones(size)/size
-        _data=np.convolve(maskdata,k,mode='same')
+    data=np.asarray(data)
+    maskdata=(data!=0).astype(int)
+    if extend != 0 and maskdata.size > 0:
+        e=int(abs(extend))
+        n=maskdata.shape[-1]
+        # c[k]为前k个点中非零点的个数，窗口[i-e,i+e]内的个数为 c[i+e+1]-c[i-e]
+        c=np.zeros(maskdata.shape[:-1]+(n+1,),dtype=np.int64)
+        np.cumsum(maskdata,axis=-1,out=c[...,1:])
+        i=np.arange(n)
+        count=c[...,np.minimum(i+e+1,n)]-c[...,np.maximum(i-e,0)]
         if extend>0:
-            maskdata=np.where(_data==0,0,1)
-        elif extend<0:  
-            # 由于计算精度限制，部分卷积结果不会严格等于1，误差在1e-15量级，所以加了阈值1e-9，
-            # 在extend点数小于1e9时，掩膜是完全精确的
-            maskdata=np.where(np.abs(1-_data)<1e-9,1,0) 
+            maskdata=(count>0).astype(int)
+        else:
+            maskdata=(count==2*e+1).astype(int)
+    if intervals:
+        return maskdata,_intervals(maskdata)
     return maskdata
 
-def wdMask(wd,extend_len=0,extend_point=None):
+def wdMask(wd,extend_len=0,extend_point=None,intervals=False):
     '''获取Wavedata类实例的掩模
 
     Parameters:
-        wd: Wavedata类的实例
+        wd: Wavedata类的实例，或者WavedataN(各波形采样率需相同，一次计算)
         extend_len: 掩模扩展的时间长度(一侧)，实际扩展点数与wd的采样率有关，正数向外扩展，负数向内收缩
         extend_point: 掩模扩展的点数(一侧)，如果设置数值，将优先于extend_len生效
+        intervals: 为True时同时返回掩模为1的时间区间列表 [(start, stop), ...]
     
     Return:
-        掩模Wavedata类实例，data为0或1的二值序列
+        掩模Wavedata类实例，data为0或1的二值序列；传入WavedataN时返回DenseWavedataN
     '''
+    if isinstance(wd,WavedataN):
+        dwd=wd.dense()
+        sRate=dwd.sRate
+        extend = np.around(extend_len*sRate).astype(int) if extend_point is None else int(extend_point)
+        # 各波形长度之外的部分为0，收缩时需要逐行把长度之外视为0
+        maskdata=dataMask(dwd.data,extend)
+        if extend < 0 and not dwd.isUniform:
+            e=-extend
+            maskdata=maskdata*(np.arange(maskdata.shape[-1]) < (dwd.lengths-e)[:,None])
+        res=dwd._new(dwd._masked(maskdata,dwd.lengths))
+        if intervals:
+            iv=[[(a/sRate,b/sRate) for a,b in row] for row in _intervals(res.data)]
+            return res,iv
+        return res
     assert isinstance(wd,Wavedata)
     extend = np.around(extend_len*wd.sRate).astype(int) if extend_point is None else int(extend_point)
     maskdata = dataMask(wd.data,extend)
+    if intervals:
+        iv=[(a/wd.sRate,b/wd.sRate) for a,b in _intervals(maskdata)]
+        return Wavedata(maskdata,wd.sRate),iv
     return Wavedata(maskdata,wd.sRate)
 
 def wdDRAG(wd, a=1e-9):
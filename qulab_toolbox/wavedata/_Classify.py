@@ -0,0 +1,234 @@
+'''单发读出结果的态判别模块
+
+对 (发数, 频率数) 的复数IQ数组整体判别，每个频率(比特)单独训练分类器；
+提供分配矩阵(assignment matrix)和多比特联合结果的统计'''
+
+import numpy as np
+
+__all__ = ['LinearClassifier', 'GMMClassifier', 'assignment_matrix',
+    'joint_outcomes', 'joint_histogram']
+
+
+def _iq(data):
+    '''转化为 (发数, 频率数) 的复数数组'''
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:,None]
+    return data
+
+def _states_dtype(levels):
+    return np.int8 if levels <= 127 else np.int32
+
+def _moments(x, y, r=None):
+    '''(加权的)均值和2x2协方差，x,y为 (频率数, 发数) 的实部和虚部，r为同形状的权重；
+    沿最后一维(连续内存)求和，2x2矩阵的各元素分别计算'''
+    if r is None:
+        r = np.ones_like(x)
+    N = r.sum(axis=-1)+1e-300
+    mx = np.einsum('tn,tn->t', r, x)/N
+    my = np.einsum('tn,tn->t', r, y)/N
+    dx, dy = x-mx[:,None], y-my[:,None]
+    rdx = r*dx
+    sxx = np.einsum('tn,tn->t', rdx, dx)/N
+    sxy = np.einsum('tn,tn->t', rdx, dy)/N
+    syy = np.einsum('tn,tn->t', r*dy, dy)/N
+    mu = np.stack([mx, my], axis=-1)
+    cov = np.stack([np.stack([sxx, sxy], axis=-1), np.stack([sxy, syy], axis=-1)], axis=-2)
+    return mu, cov
+
+class LinearClassifier(object):
+    '''线性判别，按各个态IQ中心的最近距离分类
+
+    两能级时等价于沿两态中心连线(分离轴)投影，以中点为阈值；
+    多能级(如qutrit)时判决边界为各中心连线的中垂线'''
+
+    def __init__(self):
+        self.centers = None
+
+    @property
+    def levels(self):
+        return self.centers.shape[0]
+
+    def fit(self, *clouds):
+        '''传入各个态制备后测得的IQ，clouds[k]为态k的 (发数, 频率数) 数组'''
+        self.centers = np.array([_iq(c).mean(axis=0) for c in clouds])
+        return self
+
+    @property
+    def axis(self):
+        '''两能级的分离轴方向(单位复数)，每个频率一个'''
+        d = self.centers[1]-self.centers[0]
+        return d/np.abs(d)
+
+    @property
+    def threshold(self):
+        '''两能级时分离轴上投影的阈值'''
+        return np.real((self.centers[0]+self.centers[1])/2*np.conj(self.axis))
+
+    def project(self, data):
+        '''两能级时IQ在分离轴上的投影'''
+        return np.real(_iq(data)*np.conj(self.axis))
+
+    def predict(self, data):
+        '''返回 (发数, 频率数) 的整数态数组'''
+        assert self.centers is not None, 'Classifier is not fitted!'
+        data = _iq(data)
+        if self.levels == 2:
+            return (self.project(data) > self.threshold).astype(_states_dtype(2))
+        dist = np.abs(data[:,:,None]-self.centers.T[None,:,:])
+        return np.argmin(dist, axis=-1).astype(_states_dtype(self.levels))
+
+    def assignment(self, *clouds):
+        '''各个态制备后测得的IQ的分配矩阵，参考assignment_matrix'''
+        return assignment_matrix([self.predict(c) for c in clouds], self.levels)
+
+
+class GMMClassifier(object):
+    '''高斯混合模型判别，每个态为IQ平面上的二维高斯分布(协方差任意)，按后验概率最大分类
+
+    fit由标定数据直接估计各分量；fit_mixture用EM算法拟合未标定的混合数据'''
+
+    def __init__(self, levels=2, reg=1e-9):
+        '''levels: 态的个数; reg: 协方差的正则化系数'''
+        self._levels = levels
+        self.reg = reg
+        self.means = None  # (能级, 频率数, 2)
+        self.covs = None   # (能级, 频率数, 2, 2)
+        self.weights = None # (能级, 频率数)
+
+    @property
+    def levels(self):
+        return self._levels
+
+    @staticmethod
+    def _xy(data):
+        '''转化为 (频率数, 发数) 的连续实部和虚部数组'''
+        data = _iq(data)
+        return np.ascontiguousarray(data.real.T), np.ascontiguousarray(data.imag.T)
+
+    def _regularize(self, cov):
+        scale = np.trace(cov, axis1=-2, axis2=-1)[...,None,None]/2
+        return cov+self.reg*scale*np.eye(2)
+
+    def _set(self, moments, weights=None):
+        self.means = np.array([mu for mu, _ in moments])
+        self.covs = self._regularize(np.array([cov for _, cov in moments]))
+        if weights is None:
+            weights = np.full(self.means.shape[:2], 1/self._levels)
+        self.weights = weights
+
+    def fit(self, *clouds):
+        '''传入各个态制备后测得的IQ，clouds[k]为态k的 (发数, 频率数) 数组'''
+        self._levels = len(clouds)
+        self._set([_moments(*self._xy(c)) for c in clouds])
+        return self
+
+    def _init_mixture(self, x, y):
+        '''沿混合数据的主轴(方差最大的方向)按分位数初始化各分量'''
+        _, cov = _moments(x, y)
+        sxx, sxy, syy = cov[:,0,0], cov[:,0,1], cov[:,1,1]
+        theta = 0.5*np.arctan2(2*sxy, sxx-syy) # 主轴方向，实部分量非负
+        proj = np.cos(theta)[:,None]*x+np.sin(theta)[:,None]*y
+        order = np.argsort(proj, axis=-1)
+        n = x.shape[-1]
+        moments = []
+        for k in range(self._levels):
+            idx = order[:,k*n//self._levels:(k+1)*n//self._levels]
+            moments.append(_moments(np.take_along_axis(x, idx, axis=-1),
+                                    np.take_along_axis(y, idx, axis=-1)))
+        self._set(moments)
+
+    def _logp(self, x, y):
+        '''各分量的对数概率(含权重)，形状 (能级, 频率数, 发数)'''
+        logp = np.empty((self._levels,)+x.shape)
+        for k in range(self._levels):
+            dx, dy = x-self.means[k,:,0,None], y-self.means[k,:,1,None]
+            sxx, sxy, syy = self.covs[k,:,0,0], self.covs[k,:,0,1], self.covs[k,:,1,1]
+            det = sxx*syy-sxy**2
+            c = np.log(self.weights[k])-0.5*np.log(det)-np.log(2*np.pi)
+            mahal = ((syy/det)[:,None]*dx-(2*sxy/det)[:,None]*dy)*dx+(sxx/det)[:,None]*dy**2
+            logp[k] = c[:,None]-0.5*mahal
+        return logp
+
+    def fit_mixture(self, data, max_iter=100, tol=1e-6):
+        '''用EM算法拟合混合数据；已经fit过时以当前参数为初值，否则沿数据主轴按分位数初始化，
+        此时态的编号按各分量均值在主轴上的投影排序(主轴取实部分量非负的方向)，
+        需要确定的编号时应先用标定数据fit'''
+        x, y = self._xy(data)
+        if self.means is None:
+            self._init_mixture(x, y)
+        n = x.shape[-1]
+        last = -np.inf
+        for _ in range(max_iter):
+            logp = self._logp(x, y)
+            lmax = logp.max(axis=0)
+            r = np.exp(logp-lmax)
+            total = r.sum(axis=0)
+            r /= total # (能级, 频率数, 发数)
+            self._set([_moments(x, y, r[k]) for k in range(self._levels)],
+                      weights=r.sum(axis=-1)/n)
+            ll = (lmax+np.log(total)).sum()/n
+            if abs(ll-last) < tol:
+                break
+            last = ll
+        return self
+
+    def proba(self, data):
+        '''各个态的后验概率，形状 (发数, 频率数, 能级)'''
+        logp = self._logp(*self._xy(data))
+        p = np.exp(logp-logp.max(axis=0))
+        p /= p.sum(axis=0)
+        return p.transpose(2, 1, 0)
+
+    def predict(self, data):
+        '''返回 (发数, 频率数) 的整数态数组'''
+        assert self.means is not None, 'Classifier is not fitted!'
+        logp = self._logp(*self._xy(data))
+        return np.argmax(logp, axis=0).T.astype(_states_dtype(self._levels))
+
+    def assignment(self, *clouds):
+        '''各个态制备后测得的IQ的分配矩阵，参考assignment_matrix'''
+        return assignment_matrix([self.predict(c) for c in clouds], self._levels)
+
+
+def assignment_matrix(states_list, levels=2):
+    '''分配矩阵
+
+    Parameters:
+        states_list: 列表，第k个元素为制备态k后判别得到的 (发数, 频率数) 整数态数组
+        levels: 态的个数
+
+    Return:
+        (频率数, 制备态, 测得态) 的数组，M[q,i,j] 为比特q制备在i时测得j的概率；
+        对角元为各态的判别保真度
+    '''
+    res = []
+    for states in states_list:
+        states = _iq(states).astype(np.int64)
+        tones = states.shape[1]
+        # 频率编号与态一起编码为一个整数，一次bincount统计
+        idx = states+levels*np.arange(tones)
+        counts = np.bincount(idx.ravel(), minlength=levels*tones).reshape(tones, levels)
+        res.append(counts/max(states.shape[0], 1))
+    return np.stack(res, axis=1)
+
+def joint_outcomes(states, levels=2):
+    '''把每一发各比特的结果编码为一个整数，比特q的权重为 levels**q；
+    两能级时即按位打包，比特0为最低位'''
+    states = _iq(states)
+    tones = states.shape[1]
+    if levels == 2 and tones <= 64:
+        dtype = np.int64 if tones < 63 else np.uint64
+        shift = np.arange(tones, dtype=dtype)
+        return np.bitwise_or.reduce(states.astype(dtype) << shift, axis=1)
+    assert levels**tones < 2**63
+    return states.astype(np.int64) @ (levels**np.arange(tones, dtype=np.int64))
+
+def joint_histogram(states, levels=2, normalize=True):
+    '''多比特联合结果的统计，返回长度为 levels**比特数 的数组，下标为joint_outcomes的编码'''
+    states = _iq(states)
+    tones = states.shape[1]
+    counts = np.bincount(joint_outcomes(states, levels), minlength=levels**tones)
+    if normalize:
+        return counts/max(states.shape[0], 1)
+    return counts
@@ -1,46 +1,334 @@
 import numpy as np
-from ._wavedata import Wavedata
+from ._wavedata import Wavedata, WavedataN
+from ._dense import DenseWavedataN
+from . import _process as p
+from ._cache import LRUCache
 import scipy.signal as signal
 from scipy.stats import multivariate_normal
 import matplotlib.pyplot as plt
 
 '''Wavedata 滤波器模块，包含一些数字滤波器'''
 
+# scipy>=1.15 中 sosfreqz 更名为 freqz_sos
+_freqz_sos = getattr(signal, 'freqz_sos', None) or signal.sosfreqz
+
+# 滤波器设计结果的缓存，以设计函数名和参数为键，IIRFilter/BesselFilter/baFilter/GaussKernal共用
+_design_cache = LRUCache(maxsize=256)
+
+def _hashable(v):
+    '''把列表、数组等参数转化为可以作为键的元组'''
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return tuple([_hashable(x) for x in v])
+    elif isinstance(v, np.generic):
+        return v.item()
+    return v
+
+def _readonly(v):
+    if isinstance(v, tuple):
+        return tuple([_readonly(x) for x in v])
+    v = np.array(v)
+    v.flags.writeable = False
+    return v
+
+def _copy(v):
+    if isinstance(v, tuple):
+        return tuple([_copy(x) for x in v])
+    return np.array(v)
+
+def _cached_design(name, func, **kw):
+    '''调用func(**kw)设计滤波器，相同参数的结果从缓存中取出；
+    缓存中的数组是只读的，返回其副本(系数很少，复制的开销可以忽略)'''
+    key = (name, tuple(sorted([(k, _hashable(v)) for k, v in kw.items()])))
+    res = _design_cache.get(key)
+    if res is None:
+        res = _design_cache.put(key, _readonly(func(**kw)))
+    return _copy(res)
+
+def design_cache_info():
+    '''返回滤波器设计缓存的统计 dict(hits, misses, size, maxsize)'''
+    return _design_cache.info()
+
+def clear_design_cache():
+    '''清空滤波器设计缓存'''
+    _design_cache.clear()
+
 class Filter(object):
     """滤波器基类，默认不处理波形，可传入一个处理函数产生相应的滤波器实例"""
     def __init__(self, process=None):
         self._process = process
 
-    def process(self,data,sRate):
-        '''Filter处理函数，输入输出都是(data,sRate)格式'''
+    def process(self,data,sRate,axis=-1):
+        '''Filter处理函数，输入输出都是(data,sRate)格式；
+        data可以是多维数组，沿axis滤波，传入的处理函数只需处理最后一维'''
         if self._process is not None:
+            data = np.moveaxis(np.asarray(data),axis,-1)
             data,sRate = self._process(data,sRate)
+            data = np.moveaxis(data,-1,axis)
         return data,sRate
 
     def filt(self,wd):
-        '''传入Wavedata实例，返回滤波后的Waveda'''
+        '''传入Wavedata/WavedataN实例，返回滤波后的同类实例；
+        WavedataN中各波形点数和采样率相同时堆叠成二维数组一次滤波'''
+        if isinstance(wd,DenseWavedataN):
+            return wd.filter(self)
+        elif isinstance(wd,WavedataN):
+            data, sRate = wd._stacked()
+            if data is not None:
+                data,sRate = self.process(data,sRate)
+                return WavedataN.init(data,np.full(wd.shape,sRate))
+            return WavedataN(np.frompyfunc(self.filt,1,1)(wd.array))
         assert isinstance(wd,Wavedata)
         data,sRate = self.process(wd.data,wd.sRate)
         return Wavedata(data,sRate)
 
-
-def series(*arg):
-    '''串联多个Filter'''
-    def process(data,sRate):
-        for f in arg:
-            data,sRate = f.process(data,sRate)
+    def stream(self,axis=-1):
+        '''返回流式滤波对象，push(chunk)逐段输入数据并返回对应的输出，最后调用flush取出剩余输出；
+        不处理的Filter返回直通的流；由任意处理函数构造的Filter(如DCBlock)和
+        没有实现stream的子类(如WGN、ParallelFilter)不支持流式处理'''
+        if type(self).process is Filter.process and self._process is None:
+            return FilterStream(axis)
+        raise NotImplementedError('%s does not support streaming!' % type(self).__name__)
+
+
+class FilterStream(object):
+    '''流式滤波基类，默认直接输出输入的数据
+
+    push(chunk) 输入一段数据(可以是多维数组，沿axis分段)，返回这一段对应的输出；
+    flush() 在数据结束时调用，返回因延迟尚未输出的部分'''
+
+    def __init__(self, axis=-1):
+        self.axis = axis
+        self._shape = None
+
+    def push(self, chunk):
+        x = np.moveaxis(np.asarray(chunk),self.axis,-1)
+        self._shape = x.shape[:-1]
+        y = self._push(x)
+        return np.moveaxis(y,-1,self.axis)
+
+    def flush(self):
+        if self._shape is None:
+            return np.zeros(0)
+        y = self._flush()
+        return np.moveaxis(y,-1,self.axis)
+
+    def reset(self):
+        '''清除状态，重新开始'''
+        self._shape = None
+
+    def _push(self, x):
+        return x
+
+    def _flush(self):
+        return np.zeros(self._shape+(0,))
+
+
+class SOSStream(FilterStream):
+    '''二阶节IIR滤波的流式处理，段与段之间传递sosfilt的状态zi；
+    注意流式处理是单向(因果)滤波，与process中的零相位sosfiltfilt不同'''
+
+    def __init__(self, sos, axis=-1):
+        super(SOSStream, self).__init__(axis)
+        self.sos = np.asarray(sos)
+        self.zi = None
+
+    def reset(self):
+        super(SOSStream, self).reset()
+        self.zi = None
+
+    def _push(self, x):
+        if self.zi is None:
+            self.zi = np.zeros((self.sos.shape[0],)+x.shape[:-1]+(2,), dtype=np.result_type(x, self.sos))
+        elif np.iscomplexobj(x) and not np.iscomplexobj(self.zi):
+            self.zi = self.zi.astype(complex)
+        if x.shape[-1] == 0:
+            return x.astype(self.zi.dtype)
+        y, self.zi = signal.sosfilt(self.sos, x, axis=-1, zi=self.zi)
+        return y
+
+
+class BAStream(FilterStream):
+    '''传递函数形式IIR滤波的流式处理，段与段之间传递lfilter的状态zi'''
+
+    def __init__(self, b, a, axis=-1):
+        super(BAStream, self).__init__(axis)
+        self.b, self.a = np.atleast_1d(b), np.atleast_1d(a)
+        self.zi = None
+
+    def reset(self):
+        super(BAStream, self).reset()
+        self.zi = None
+
+    def _push(self, x):
+        order = max(self.a.size, self.b.size)-1
+        if self.zi is None:
+            self.zi = np.zeros(x.shape[:-1]+(order,), dtype=np.result_type(x, self.a, self.b))
+        elif np.iscomplexobj(x) and not np.iscomplexobj(self.zi):
+            self.zi = self.zi.astype(complex)
+        if x.shape[-1] == 0:
+            return x.astype(self.zi.dtype)
+        y, self.zi = signal.lfilter(self.b, self.a, x, axis=-1, zi=self.zi)
+        return y
+
+
+class ConvStream(FilterStream):
+    '''卷积(FIR)的流式处理，保留上一段末尾的 len(kernal)-1 个点用于重叠；
+    输出与 mode='same' 的卷积一致，因此有 (len(kernal)-1)//2 个点的延迟，由flush补齐'''
+
+    def __init__(self, kernal, axis=-1):
+        super(ConvStream, self).__init__(axis)
+        self.kernal = np.asarray(kernal)
+        self.reset()
+
+    def reset(self):
+        super(ConvStream, self).reset()
+        self._tail = None
+        self._skip = (self.kernal.size-1)//2 # 'same'模式丢弃的前几个点
+
+    def _push(self, x):
+        K = self.kernal.size
+        if self._tail is None:
+            self._tail = np.zeros(x.shape[:-1]+(K-1,), dtype=x.dtype)
+        ext = np.concatenate([self._tail, x], axis=-1)
+        L = x.shape[-1]
+        if L == 0:
+            return x.astype(np.result_type(x, self.kernal))
+        kernal = self.kernal.reshape((1,)*(ext.ndim-1)+(K,))
+        y = signal.convolve(ext, kernal, mode='valid') # 只计算新输入对应的完整卷积点
+        self._tail = ext[...,ext.shape[-1]-(K-1):]
+        skip = min(self._skip, L)
+        self._skip -= skip
+        return y[...,skip:]
+
+    def _flush(self):
+        h = (self.kernal.size-1)//2
+        return self._push(np.zeros(self._shape+(h,), dtype=self._tail.dtype))
+
+
+class SeriesStream(FilterStream):
+    '''串联滤波器的流式处理'''
+
+    def __init__(self, streams, axis=-1):
+        super(SeriesStream, self).__init__(axis)
+        self.streams = list(streams)
+
+    def reset(self):
+        super(SeriesStream, self).reset()
+        for st in self.streams:
+            st.reset()
+
+    def _push(self, x):
+        for st in self.streams:
+            x = st._push(x)
+            st._shape = x.shape[:-1]
+        return x
+
+    def _flush(self):
+        x = None
+        for st in self.streams:
+            y = st._push(x) if x is not None and x.shape[-1] > 0 else None
+            if st._shape is None:
+                st._shape = self._shape
+            z = st._flush()
+            x = z if y is None else np.concatenate([y, z], axis=-1)
+        return x
+
+
+def _fusible_sos(f1, f2):
+    return (isinstance(f1, baFilter) and isinstance(f2, baFilter)
+            and f1.sos is not None and f2.sos is not None
+            and f1.dict['fs'] == f2.dict['fs'])
+
+def _fusible_fir(f1, f2):
+    # 只合并长度为奇数的卷积核，保证合并后中心对齐
+    return (isinstance(f1, FIRFilter) and isinstance(f2, FIRFilter)
+            and f1.kernal.size % 2 == 1 and f2.kernal.size % 2 == 1)
+
+def _is_removeDC(f):
+    return type(f) is Filter and f._process is removeDC
+
+def _fuse(filters):
+    '''合并相邻的可合并级：sos级联拼接，卷积核相互卷积，重复的removeDC只保留一个，去掉不处理的Filter'''
+    fused = []
+    for f in filters:
+        if isinstance(f, SeriesFilter):
+            stages = f.filters
+        else:
+            stages = [f]
+        for f in stages:
+            if type(f) is Filter and f._process is None:
+                continue
+            last = fused[-1] if fused else None
+            if last is not None and _fusible_sos(last, f):
+                fused[-1] = baFilter.from_sos(np.concatenate([last.sos, f.sos]), last.dict['fs'])
+            elif last is not None and _fusible_fir(last, f):
+                fused[-1] = FIRFilter(np.convolve(last.kernal, f.kernal), last.method)
+            elif last is not None and _is_removeDC(last) and _is_removeDC(f):
+                continue
+            else:
+                fused.append(f)
+    return fused
+
+
+class SeriesFilter(Filter):
+    '''串联多个Filter
+
+    fuse=True时合并相邻的同类级，整条链只需遍历数据一次或少数几次；
+    合并后的结果与逐级处理只在波形两端(滤波器暂态的长度内)略有差别'''
+
+    def __init__(self, *arg, **kw):
+        self.stages = list(arg)
+        self.filters = _fuse(arg) if kw.get('fuse', True) else list(arg)
+
+    def process(self,data,sRate,axis=-1):
+        for f in self.filters:
+            data,sRate = f.process(data,sRate,axis=axis)
         return data,sRate
-    F = Filter(process)
+
+    def stream(self,axis=-1):
+        '''各级依次流式处理，任意一级不支持流式处理(如DCBlock)时抛出NotImplementedError'''
+        return SeriesStream([f.stream() for f in self.filters], axis)
+
+
+def series(*arg, **kw):
+    '''串联多个Filter，fuse=True(默认)时合并相邻的同类级，合并后只剩一级时直接返回该级；
+    包含DCBlock等不支持流式处理的级时，结果的stream会抛出NotImplementedError'''
+    F = SeriesFilter(*arg, **kw)
+    if len(F.filters) == 1:
+        return F.filters[0]
     return F
 
 
+class ParallelFilter(Filter):
+    '''并联多个Filter，输出为各级输出的平均，逐级累加到同一个数组'''
+
+    def __init__(self, *arg):
+        self.filters = list(arg)
+
+    def process(self,data,sRate,axis=-1):
+        out, _sRate = None, sRate
+        for f in self.filters:
+            d, _sRate = f.process(data,sRate,axis=axis)
+            if out is None:
+                out = np.array(d, dtype=np.result_type(d, 0.0))
+            elif np.can_cast(np.result_type(d), out.dtype):
+                out += d
+            else:
+                out = out + d
+        out /= len(self.filters)
+        return out,_sRate
+
+
 def parallel(*arg):
-    '''并联多个Filter'''
-    def process(data,sRate):
-        d_list = [f.process(data,sRate)[0] for f in arg]
-        d = np.array(d_list).sum(axis=0)/len(arg)
-        return d,sRate
-    F = Filter(process)
+    '''并联多个Filter；全部为奇数长度的卷积滤波器时，合并为平均卷积核的单个FIRFilter'''
+    if arg and all([isinstance(f, FIRFilter) and f.kernal.size % 2 == 1 for f in arg]):
+        size = max([f.kernal.size for f in arg])
+        kernal = np.zeros(size, dtype=np.result_type(*[f.kernal for f in arg]))
+        for f in arg:
+            pad = (size-f.kernal.size)//2
+            kernal[pad:pad+f.kernal.size] += f.kernal
+        return FIRFilter(kernal/len(arg))
+    F = ParallelFilter(*arg)
     return F
 
 
@@ -49,34 +337,70 @@ class WGN(Filter):
     def __init__(self, snr):
         self.snr = snr
 
-    def process(self,data,sRate):
-        x=data
+    def process(self,data,sRate,axis=-1):
+        x=np.asarray(data)
         snr = 10**(self.snr/10.0)
-        xpower = np.sum(x**2)/len(x)
+        xpower = np.mean(np.abs(x)**2,axis=axis,keepdims=True) # 每个波形单独计算功率
         npower = xpower / snr
-        n = np.random.randn(len(x)) * np.sqrt(npower)
+        n = np.random.randn(*x.shape) * np.sqrt(npower)
         _data = x + n
         return _data,sRate
 
 
 class baFilter(Filter):
-    """指定signal模块里包含的滤波器函数名,生成相关的结果为 ba 的数字滤波器."""
-    def __init__(self, name='', **kw):
+    """指定signal模块里包含的滤波器函数名,生成相关的数字滤波器；
+    默认以二阶节(sos)形式设计和滤波，数值稳定性更好，sos=False时使用 ba 形式."""
+    def __init__(self, name='', sos=True, **kw):
         # 指定signal里包含的滤波器函数名,传入相关的参数
-        kw.update(output='ba',analog=False)
+        kw.update(output='sos' if sos else 'ba',analog=False)
         self.dict=kw  # self.dict必须包含fs
         filtertype = getattr(signal,name)
-        self.ba = filtertype(**self.dict)
-
-    def process(self,data,sRate):
+        self._design(filtertype)
+
+    @classmethod
+    def from_sos(cls,sos,fs):
+        '''由已有的二阶节系数构造滤波器'''
+        flt = cls.__new__(cls)
+        flt.dict = dict(output='sos',analog=False,fs=fs)
+        flt.sos, flt._ba = np.asarray(sos), None
+        return flt
+
+    def _design(self,filtertype):
+        '''按self.dict设计滤波器，结果保存为sos或者ba'''
+        res = _cached_design(filtertype.__name__, filtertype, **self.dict)
+        if self.dict['output'] == 'sos':
+            self.sos, self._ba = res, None
+        else:
+            self.sos, self._ba = None, res
+
+    @property
+    def ba(self):
+        '''传递函数形式的系数(b,a)，sos形式的滤波器由sos转换得到'''
+        if self._ba is None:
+            return signal.sos2tf(self.sos)
+        return self._ba
+
+    def process(self,data,sRate,axis=-1):
         assert sRate == self.dict['fs']
-        b,a = self.ba
-        _data = signal.filtfilt(b, a, data)
+        if self.sos is not None:
+            _data = signal.sosfiltfilt(self.sos, data, axis=axis)
+        else:
+            b,a = self.ba
+            _data = signal.filtfilt(b, a, data, axis=axis)
         return _data, sRate
 
+    def stream(self,axis=-1):
+        '''流式滤波，段间传递IIR状态；注意为单向因果滤波'''
+        if self.sos is not None:
+            return SOSStream(self.sos, axis)
+        return BAStream(*self.ba, axis=axis)
+
     def freqz(self):
         '''返回数字滤波器频率响应'''
-        w,h = signal.freqz(*self.ba,fs=self.dict['fs'])
+        if self.sos is not None:
+            w,h = _freqz_sos(self.sos,fs=self.dict['fs'])
+        else:
+            w,h = signal.freqz(*self.ba,fs=self.dict['fs'])
         return w,h
 
     def plot(self):
@@ -96,24 +420,24 @@ class baFilter(Filter):
 class IIRFilter(baFilter):
     '''参考scipy.signal.iirfilter'''
     def __init__(self, N=2, Wn=[49e6, 51e6], rp=0.01, rs=100, btype='band',
-                     ftype='ellip', fs=1e9):
+                     ftype='ellip', fs=1e9, sos=True):
         # 为避免麻烦，不继承 baFilter.__init__ 函数，只继承其他函数
         # 默认参数是一个50MHz的 ellip 滤波器
-        # 配置字典, default: output='ba',analog=False,
-        self.dict=dict(N=N, Wn=Wn, rp=rp, rs=rs, btype=btype,
-                        analog=False, ftype=ftype, output='ba', fs=fs)
-        self.ba = signal.iirfilter(**self.dict)
+        # 配置字典, default: output='sos',analog=False,
+        self.dict=dict(N=N, Wn=Wn, rp=rp, rs=rs, btype=btype, analog=False,
+                        ftype=ftype, output='sos' if sos else 'ba', fs=fs)
+        self._design(signal.iirfilter)
 
 class BesselFilter(baFilter):
     '''参考scipy.signal.bessel'''
     def __init__(self, N=2, Wn=100e6, btype='low',
-                     norm='phase', fs=1e9):
+                     norm='phase', fs=1e9, sos=True):
         # 为避免麻烦，不继承 baFilter.__init__ 函数，只继承其他函数
         # 默认参数是一个100MHz的 2阶低通贝塞尔滤波器
-        # 配置字典, default: output='ba',analog=False,
-        self.dict=dict(N=N, Wn=Wn, btype=btype,
-                        analog=False, output='ba', norm=norm, fs=fs)
-        self.ba = signal.bessel(**self.dict)
+        # 配置字典, default: output='sos',analog=False,
+        self.dict=dict(N=N, Wn=Wn, btype=btype, analog=False,
+                        output='sos' if sos else 'ba', norm=norm, fs=fs)
+        self._design(signal.bessel)
 
 
 def GaussKernal2D(halfsize,a=2,factor=1,xy='X',):
@@ -153,20 +477,31 @@ def GaussKernal(halfsize,a=2):
     Return:
         m: 一维 np.ndarray, 一维高斯卷积核
     '''
+    return _cached_design('GaussKernal', _GaussKernal, halfsize=halfsize, a=a)
+
+def _GaussKernal(halfsize,a=2):
     rv = multivariate_normal(0, 1)
     x0=np.linspace(-a,a,2*halfsize+1)
     _m=rv.pdf(x0)
     m=_m/np.sum(_m)
     return m
 
-class GaussFilter(Filter):
-    '''高斯低通数字滤波器，通过卷积实现'''
-    def __init__(self,halfsize,a=2):
-        self.kernal=GaussKernal(halfsize,a)
+class FIRFilter(Filter):
+    '''由卷积核构造的FIR数字滤波器，通过卷积实现；
+    method为卷积方法，'auto'时根据数据和卷积核点数在直接/FFT/重叠相加卷积中选择'''
+    def __init__(self,kernal,method='auto'):
+        self.kernal=np.asarray(kernal)
+        self.method=method
 
-    def process(self,data,sRate):
-        _data=np.convolve(data,self.kernal,mode='same')
-        return _data,sRate
+    def process(self,data,sRate,axis=-1):
+        # 补0卷积，结果与 np.convolve(mode='same') 一致
+        data = np.moveaxis(np.asarray(data),axis,-1)
+        _data,sRate = p.convolve(data,sRate,self.kernal,mode='same',method=self.method)
+        return np.moveaxis(_data,-1,axis),sRate
+
+    def stream(self,axis=-1):
+        '''流式卷积，输出与process一致'''
+        return ConvStream(self.kernal,axis)
 
     def plot(self,sRate=1e9):
         ax=plt.gca()
@@ -179,15 +514,21 @@ class GaussFilter(Filter):
         # ax1.set_ylabel('Phase Factor')
         return [line1,]
 
-def removeDC(data,sRate):
-    '''去除直流成分，可以近似为扣除平均值'''
-    _data=np.array(data)-np.mean(data)
+class GaussFilter(FIRFilter):
+    '''高斯低通数字滤波器，通过卷积实现'''
+    def __init__(self,halfsize,a=2,method='auto'):
+        self.kernal=GaussKernal(halfsize,a)
+        self.method=method
+
+def removeDC(data,sRate,axis=-1):
+    '''去除直流成分，可以近似为扣除平均值，多维数组沿axis计算'''
+    _data=np.array(data)-np.mean(data,axis=axis,keepdims=True)
     return _data,sRate
 
 # 滤波器实例，可直接使用
 DCBlock=Filter(removeDC)
 
-def bandpass(center=None,span=None,start=None,stop=None,fs=1e9):
+def bandpass(center=None,span=None,start=None,stop=None,fs=1e9,sos=True):
     '''生成IIRFilter的一个带通滤波器实例'''
     if start is not None and stop is not None:
         start,stop=start,stop
@@ -195,15 +536,15 @@ def bandpass(center=None,span=None,start=None,stop=None,fs=1e9):
         start,stop=abs(center)-span/2, abs(center)+span/2
     else:
         raise('Band Frequency Setting Error!')
-    flt=IIRFilter(2, [start,stop], 0.01, 100, 'band', ftype='ellip', fs=fs)
+    flt=IIRFilter(2, [start,stop], 0.01, 100, 'band', ftype='ellip', fs=fs, sos=sos)
     return flt
 
-def lowpass(freq,fs=1e9):
+def lowpass(freq,fs=1e9,sos=True):
     '''生成IIRFilter的一个低通滤波器实例'''
-    flt=IIRFilter(2, abs(freq), 0.01, 100, 'low', ftype='ellip', fs=fs)
+    flt=IIRFilter(2, abs(freq), 0.01, 100, 'low', ftype='ellip', fs=fs, sos=sos)
     return flt
 
-def highpass(freq,fs=1e9):
+def highpass(freq,fs=1e9,sos=True):
     '''生成IIRFilter的一个高通滤波器实例'''
-    flt=IIRFilter(2, abs(freq), 0.01, 100, 'high', ftype='ellip', fs=fs)
-    return flt
\ No newline at end of file
+    flt=IIRFilter(2, abs(freq), 0.01, 100, 'high', ftype='ellip', fs=fs, sos=sos)
+    return flt
@@ -0,0 +1,79 @@
+'''Wavedata 匹配滤波模块
+
+由标定好的基态/激发态读出波形训练每个解调频率的积分权重，
+再用一次矩阵乘法把新的单发数据积分为IQ点'''
+
+import numpy as np
+from ._wavedata import Wavedata
+from . import _Analyze as A
+
+__all__ = ['MatchedFilter']
+
+
+class MatchedFilter(object):
+    '''读出信号的匹配滤波器
+
+    method: 'diff' 权重为两态解调波形平均值之差(的共轭);
+            'lda' 再除以每个时间点的噪声方差(对角LDA)，噪声大的时间段权重更小
+    积分得到的IQ中，两态沿实轴分开'''
+
+    def __init__(self, freqlist, sRate, method='diff', window=None, bandwidth=10e6, reg=1e-3):
+        '''window: (start, stop) 只在该时间窗口内积分;
+        bandwidth: 提取各频率包络的滤波带宽，应小于频率间隔; reg: 'lda'方差的正则化系数'''
+        self.freqlist = np.atleast_1d(np.asarray(freqlist, dtype=float))
+        self.sRate = sRate
+        self.method = method
+        self.window = window
+        self.bandwidth = bandwidth
+        self.reg = reg
+        self.weights = None
+        self.matrix = None
+
+    def fit(self, ground, excited):
+        '''由两组单发波形训练权重，可以是 (发数, 点数) 的数组或WavedataN'''
+        g, _ = A._shots(ground, self.sRate)
+        e, _ = A._shots(excited, self.sRate)
+        assert g.shape[-1] == e.shape[-1]
+        size = g.shape[-1]
+        # 解调是线性的，先求平均再解调，不需要生成每一发的解调波形
+        diff = Wavedata(e.mean(axis=0)-g.mean(axis=0), self.sRate)
+        envelope = A.Channelize(diff, self.freqlist, bandwidth=self.bandwidth).data
+        weights = np.conj(envelope)
+        if self.method == 'lda':
+            # 噪声方差由原始波形估计，对各频率相同
+            var = (np.var(g, axis=0)+np.var(e, axis=0))/2
+            var = var+self.reg*np.mean(var)
+            weights = weights/var
+        elif self.method != 'diff':
+            raise ValueError('Unknown matched filter method: %s' % self.method)
+        self.weights = weights
+        self.matrix = A.DemodMatrix(self.freqlist, size, self.sRate,
+                                    weights=weights, window=self.window)
+        return self
+
+    def apply(self, data):
+        '''对单发波形积分，返回 (发数, 频率数) 的复数数组'''
+        assert self.matrix is not None, 'MatchedFilter is not fitted!'
+        return A.IQExtract(data, sRate=self.sRate, matrix=self.matrix)
+
+    def __call__(self, data):
+        return self.apply(data)
+
+    def save(self, fname):
+        '''保存为npz文件'''
+        assert self.weights is not None, 'MatchedFilter is not fitted!'
+        window = np.array([] if self.window is None else self.window, dtype=float)
+        np.savez(fname, freqlist=self.freqlist, sRate=self.sRate, method=self.method,
+                 window=window, bandwidth=self.bandwidth, reg=self.reg, weights=self.weights)
+
+    @classmethod
+    def load(cls, fname):
+        '''由save保存的文件构造'''
+        with np.load(fname) as f:
+            window = tuple(f['window']) if f['window'].size else None
+            mf = cls(f['freqlist'], float(f['sRate']), str(f['method']), window,
+                     float(f['bandwidth']), float(f['reg']))
+            mf.weights = f['weights']
+        mf.matrix = A.DemodMatrix(mf.freqlist, mf.weights.shape[-1], mf.sRate,
+                                  weights=mf.weights, window=mf.window)
+        return mf
@@ -0,0 +1,119 @@
+'''Wavedata 数控振荡器(NCO)模块
+
+载波的相位用64位整数相位累加器计算，溢出即为对2π取模，
+长时间的载波也不会像 w*t 那样随t增大损失精度；
+常用的载波表按参数缓存，供解调和上变频重复使用'''
+
+import numpy as np
+from fractions import Fraction
+from ._cache import LRUCache
+
+__all__ = ['NCO', 'carrier', 'carrier_cache_info', 'clear_carrier_cache']
+
+_MOD = 2**64
+
+_carrier_cache = LRUCache(maxsize=32, maxbytes=2**26) # 总共不超过64MiB，更大的载波不缓存
+
+
+def _word(num, den=1):
+    '''把周期数 num/den (可以为负)转化为64位相位字，用分数精确计算，避免浮点乘以2**64的舍入误差'''
+    return round(_fraction(num)/_fraction(den)*_MOD) % _MOD
+
+def _fraction(v):
+    if isinstance(v, (int, np.integer)):
+        return Fraction(int(v))
+    return Fraction(float(v))
+
+
+class NCO(object):
+    '''数控振荡器，采样点时间为 (k+0.5)/sRate，与Wavedata的约定一致
+
+    频率字 ftw = round(freq/sRate*2**64)，频率分辨率为 sRate/2**64；
+    freq/phase可以为数组，此时同时生成多个通道的载波，形状为 freq.shape+(点数,)；
+    generate可以连续调用，逐段生成长载波，相位保持连续'''
+
+    blocksize = 2**16
+
+    def __init__(self, freq, sRate, phase=0):
+        '''freq: 频率; sRate: 采样率; phase: 初始相位，弧度制'''
+        freq, phase = np.broadcast_arrays(np.asarray(freq), np.asarray(phase))
+        self.shape = freq.shape
+        self.freq = freq
+        self.sRate = sRate
+        self.phase = phase
+        self.ftw = np.array([_word(f, sRate) for f in freq.ravel()], dtype=np.uint64)
+        self.reset()
+
+    def reset(self):
+        '''回到第一个采样点'''
+        # 第一个采样点在半个采样间隔处
+        self._acc = np.array([(_word(ph/(2*np.pi))+_word(f, 2*self.sRate)) % _MOD
+                              for f, ph in zip(self.freq.ravel(), self.phase.ravel())], dtype=np.uint64)
+
+    def _phase(self, n):
+        '''接下来n个点的相位(弧度)，形状为 (通道数, n)，并推进累加器'''
+        # uint64数组的加法和乘法溢出时回绕，即对2π取模
+        acc = self._acc[:,None]+np.arange(n, dtype=np.uint64)*self.ftw[:,None]
+        self._acc = self._acc+np.uint64(n)*self.ftw
+        # 取高53位转为浮点数，不损失精度
+        return (acc >> np.uint64(11)).astype(np.float64)*(2*np.pi/2**53)
+
+    def generate(self, n, kind='exp', dtype=None):
+        '''生成接下来n个点的载波
+
+        Parameters:
+            kind: 'exp' 复数载波 exp(1j*phase); 'cos'; 'sin'
+            dtype: 默认为complex128('exp')或float64
+        '''
+        if dtype is None:
+            dtype = complex if kind == 'exp' else float
+        n = int(n)
+        out = np.empty((self.ftw.size, n), dtype=dtype)
+        step = max(int(self.blocksize)//max(self.ftw.size, 1), 1)
+        for start in range(0, n, step):
+            stop = min(start+step, n)
+            ph = self._phase(stop-start)
+            if kind == 'exp':
+                out[:,start:stop].real = np.cos(ph)
+                out[:,start:stop].imag = np.sin(ph)
+            elif kind == 'cos':
+                out[:,start:stop] = np.cos(ph)
+            elif kind == 'sin':
+                out[:,start:stop] = np.sin(ph)
+            else:
+                raise ValueError('Unknown carrier kind: %s' % kind)
+        return out.reshape(self.shape+(n,))
+
+    def blocks(self, size, blocksize=None, kind='exp', dtype=None):
+        '''逐块生成总长为size的载波的迭代器'''
+        blocksize = self.blocksize if blocksize is None else int(blocksize)
+        for start in range(0, int(size), blocksize):
+            yield self.generate(min(blocksize, int(size)-start), kind, dtype)
+
+
+def carrier(freq, size, sRate, phase=0, kind='exp', dtype=None, cache=True):
+    '''长度为size的载波数组，k点的值为 exp(1j*(2*pi*freq*(k+0.5)/sRate+phase)) (或cos/sin)；
+    freq/phase为数组时返回 freq.shape+(size,) 的多通道载波；
+    不超过缓存容量时结果按 (freq, phase, size, sRate, dtype, kind) 缓存，返回只读数组'''
+    if dtype is None:
+        dtype = complex if kind == 'exp' else float
+    size = int(size)
+    freq, phase = np.broadcast_arrays(np.asarray(freq, dtype=float), np.asarray(phase, dtype=float))
+    key = (freq.shape, tuple(freq.ravel()), tuple(phase.ravel()), size, float(sRate), np.dtype(dtype).str, kind)
+    if cache:
+        data = _carrier_cache.get(key)
+        if data is not None:
+            return data
+    data = NCO(freq, sRate, phase).generate(size, kind, dtype)
+    if cache and data.nbytes <= _carrier_cache.maxbytes:
+        data.flags.writeable = False
+        _carrier_cache.put(key, data)
+    return data
+
+def carrier_cache_info():
+    '''返回载波缓存的统计 dict(hits, misses, size, maxsize, nbytes, maxbytes)'''
+    return _carrier_cache.info()
+
+def clear_carrier_cache():
+    '''清空载波缓存'''
+    _carrier_cache.clear()
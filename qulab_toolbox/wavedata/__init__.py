@@ -1,6 +1,12 @@
-from ._wavedata import Wavedata, WavedataN
+from ._wavedata import Wavedata, WavedataN, WavedataBuilder
 from ._wd_func import *
+from ._lazy import LazyWavedata
+from ._segmented import SegmentedWavedata
+from ._dense import DenseWavedataN
 from ._vIQmixer import vIQmixer
+from ._NCO import NCO, carrier
+from ._MatchedFilter import MatchedFilter
 from . import _Filter as F
 from . import _process as p
 from . import _Analyze as A
+from . import _Classify as C
@@ -0,0 +1,81 @@
+'''Wavedata 模块内部使用的缓存工具'''
+
+from collections import OrderedDict
+
+__all__ = ['LRUCache']
+
+
+def _nbytes(value):
+    '''值占用的字节数，元组/列表按各元素之和计算，非数组视为0'''
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class LRUCache(object):
+    '''容量有限的LRU缓存，超出maxsize时淘汰最久未使用的项，并记录命中与未命中次数
+
+    maxbytes不为None时还限制所有值的nbytes之和，单个值超过maxbytes时不缓存
+    '''
+
+    def __init__(self, maxsize=128, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {} # 各项存入时的字节数
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        '''查找key，命中时将其移到最近使用的位置'''
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value, nbytes=None):
+        '''存入key，超出容量时淘汰最久未使用的项；
+        nbytes为值占用的字节数，默认由值的nbytes计算，值不是数组(如插值函数)时需给出估计值'''
+        if nbytes is None:
+            nbytes = _nbytes(value)
+        self.pop(key)
+        if self.maxbytes is not None and nbytes > self.maxbytes:
+            return value
+        self._data[key] = value
+        self._sizes[key] = nbytes
+        self.nbytes += nbytes
+        while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes):
+            old, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(old)
+        return value
+
+    def pop(self, key, default=None):
+        '''移除key，不计入命中统计'''
+        if key not in self._data:
+            return default
+        self.nbytes -= self._sizes.pop(key)
+        return self._data.pop(key)
+
+    def clear(self):
+        '''清空缓存和统计'''
+        self._data.clear()
+        self._sizes.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        '''返回缓存统计 dict(hits, misses, size, maxsize, nbytes, maxbytes)'''
+        return dict(hits=self.hits, misses=self.misses,
+                    size=len(self._data), maxsize=self.maxsize,
+                    nbytes=self.nbytes, maxbytes=self.maxbytes)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,330 @@
+'''WavedataN 的稠密存储模块
+
+DenseWavedataN 把N个波形存为一个 (N, samples) 的二维数组，共享同一个采样率，
+各波形点数不同时用lengths记录，超出长度的部分保持为0；
+运算都是对整个二维数组的一次向量化操作'''
+
+import numpy as np
+from ._wavedata import Wavedata, WavedataN
+from . import _process as p
+
+__all__ = ['DenseWavedataN']
+
+
+class DenseWavedataN(WavedataN):
+    '''稠密存储的WavedataN，适合点数相同(或相近)的一批波形，如单发读出数据'''
+
+    def __init__(self, data=None, sRate=1, lengths=None):
+        '''data: 二维序列，每行为一个波形；lengths: 各波形的点数，默认为整行'''
+        data = np.atleast_2d(np.asarray([] if data is None else data))
+        assert data.ndim == 2
+        self._data = data
+        self._sRate = sRate
+        if lengths is None:
+            self._lengths = np.full(data.shape[0], data.shape[1], dtype=int)
+        else:
+            self._lengths = np.asarray(lengths, dtype=int)
+            assert self._lengths.shape == (data.shape[0],)
+            assert np.all(self._lengths <= data.shape[1])
+            if not self.isUniform:
+                self._data = self._masked(data, self._lengths)
+
+    @staticmethod
+    def _masked(data, lengths):
+        '''把每行超出长度的部分置0'''
+        mask = np.arange(data.shape[1]) < lengths[:,None]
+        if np.all(mask):
+            return data
+        return np.where(mask, data, 0).astype(data.dtype, copy=False)
+
+    @classmethod
+    def from_wavedataN(cls, wdN):
+        '''由WavedataN或Wavedata的列表构造，各波形采样率必须相同'''
+        array = wdN.array.ravel() if isinstance(wdN, WavedataN) else list(wdN)
+        if len(array) == 0:
+            return cls(np.zeros((0,0)))
+        sRate = array[0].sRate
+        assert all([wd.sRate == sRate for wd in array])
+        lengths = np.array([wd.size for wd in array], dtype=int)
+        dtype = np.result_type(*set([wd.data.dtype for wd in array]))
+        data = np.zeros((len(array), lengths.max()), dtype=dtype)
+        for i, wd in enumerate(array):
+            data[i,:wd.size] = wd.data
+        return cls(data, sRate, lengths)
+
+    @classmethod
+    def init(cls, dataN, sRate=1, lengths=None):
+        return cls(dataN, sRate, lengths)
+
+    def _new(self, data, sRate=None, lengths=None):
+        '''由运算结果构造新实例，lengths不变时不再重复置0'''
+        if sRate is None:
+            sRate = self._sRate
+        if lengths is None:
+            lengths = self._lengths
+        wd = self.__class__.__new__(self.__class__)
+        wd._data = data
+        wd._sRate = sRate
+        wd._lengths = np.asarray(lengths, dtype=int)
+        return wd
+
+    @property
+    def data(self):
+        '''二维数组 (N, samples)'''
+        return self._data
+
+    @property
+    def sRate(self):
+        return self._sRate
+
+    @property
+    def lengths(self):
+        '''各波形的点数'''
+        return self._lengths
+
+    @property
+    def isUniform(self):
+        '''各波形点数是否相同'''
+        return bool(np.all(self._lengths == self._data.shape[1]))
+
+    @property
+    def size(self):
+        return self._lengths
+
+    @property
+    def len(self):
+        return self._lengths/self._sRate
+
+    @property
+    def shape(self):
+        return self._data.shape[:1]
+
+    @property
+    def ndim(self):
+        return 1
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def isIQ(self):
+        if not np.iscomplexobj(self._data):
+            return np.zeros(self.shape, dtype=bool)
+        return np.any(np.imag(self._data) != 0, axis=1)
+
+    @property
+    def array(self):
+        '''Wavedata对象数组，每个元素为对应行的只读视图'''
+        array = np.empty(self.shape, dtype=object)
+        for i in range(self.shape[0]):
+            array[i] = self[i]
+        return array
+
+    def __getitem__(self, i):
+        '''第i个波形，数据为对应行的只读视图'''
+        row = self._data[i,:self._lengths[i]]
+        row.flags.writeable = False
+        return Wavedata(row, self._sRate)
+
+    def __len__(self):
+        return self._data.shape[0]
+
+    def to_wavedataN(self):
+        '''转化为普通的WavedataN'''
+        return WavedataN(self.array)
+
+    def dense(self):
+        return self
+
+    def _rows(self):
+        '''点数相同时返回二维数组，否则返回None'''
+        return self._data if self.isUniform else None
+
+    def _perrow(self, pyfunc):
+        '''点数不同时逐个波形处理，返回WavedataN'''
+        return WavedataN(np.frompyfunc(pyfunc,1,1)(self.array))
+
+    def _operand(self, other):
+        '''把运算对象转化为可与二维数组广播的形式，返回 (数组, lengths)'''
+        if isinstance(other, DenseWavedataN):
+            assert self._sRate == other._sRate
+            assert self.shape == other.shape
+            return other._data, other._lengths
+        elif isinstance(other, WavedataN):
+            return self._operand(self.from_wavedataN(other))
+        elif isinstance(other, Wavedata): # 单个波形对每一行广播
+            assert self._sRate == other.sRate
+            return other.data[None,:], np.full(self.shape, other.size)
+        else:
+            v = np.asarray(other)
+            if v.ndim == 1 and v.shape == self.shape: # 每个波形对应一个数值
+                v = v[:,None]
+            return v, None
+
+    def _binary(self, other, ufunc, reflect=False):
+        v, lengths = self._operand(other)
+        data = self._data
+        if lengths is not None:
+            cols = max(data.shape[1], v.shape[1])
+            if data.shape[1] < cols:
+                data = np.pad(data, [(0,0),(0,cols-data.shape[1])])
+            if v.shape[1] < cols:
+                v = np.pad(v, [(0,0),(0,cols-v.shape[1])])
+            lengths = np.maximum(self._lengths, lengths)
+        else:
+            lengths = self._lengths
+        res = ufunc(v, data) if reflect else ufunc(data, v)
+        return self._new(self._masked(res, lengths), lengths=lengths)
+
+    def __neg__(self):
+        return self._new(-self._data)
+
+    def __abs__(self):
+        return self._new(np.abs(self._data))
+
+    def __pow__(self, v):
+        return self._binary(v, np.power)
+
+    def __add__(self, other):
+        return self._binary(other, np.add)
+
+    def __radd__(self, v):
+        return self._binary(v, np.add, reflect=True)
+
+    def __sub__(self, other):
+        return self._binary(other, np.subtract)
+
+    def __rsub__(self, v):
+        return self._binary(v, np.subtract, reflect=True)
+
+    def __mul__(self, other):
+        return self._binary(other, np.multiply)
+
+    def __rmul__(self, v):
+        return self._binary(v, np.multiply, reflect=True)
+
+    def __truediv__(self, other):
+        return self._binary(other, np.true_divide)
+
+    def __rtruediv__(self, v):
+        return self._binary(v, np.true_divide, reflect=True)
+
+    def __rshift__(self, t):
+        '''右移 各波形点数不变，时移超过任一波形的长度时与Wavedata一样抛出TypeError'''
+        t = float(t)
+        if self._lengths.size and abs(t) > self.len.min():
+            raise TypeError('shift is too large !')
+        n = np.around(abs(t)*self._sRate).astype(int)
+        if n == 0:
+            return self
+        data = np.zeros_like(self._data)
+        if t > 0:
+            data[:,n:] = self._data[:,:-n]
+        else:
+            data[:,:-n] = self._data[:,n:]
+        return self._new(self._masked(data, self._lengths))
+
+    def __lshift__(self, t):
+        return self >> (-float(t))
+
+    def __or__(self, other):
+        '''串联 每行分别串联'''
+        if not isinstance(other, DenseWavedataN):
+            other = self.from_wavedataN(other)
+        assert self._sRate == other._sRate
+        assert self.shape == other.shape
+        lengths = self._lengths+other._lengths
+        dtype = np.result_type(self._data, other._data)
+        data = np.zeros((self.shape[0], lengths.max() if lengths.size else 0), dtype=dtype)
+        data[:,:self._data.shape[1]] = self._data
+        cols = self._lengths[:,None]+np.arange(other._data.shape[1])
+        rows = np.broadcast_to(np.arange(self.shape[0])[:,None], cols.shape)
+        valid = cols < lengths[:,None]
+        data[rows[valid], cols[valid]] = other._data[valid]
+        return self._new(data, lengths=lengths)
+
+    def __xor__(self, n):
+        n = np.around(n).astype(int)
+        if n <= 0:
+            return self._new(np.zeros((self.shape[0],0), self.dtype), lengths=np.zeros(self.shape, int))
+        if self.isUniform:
+            return self._new(np.tile(self._data, (1,n)), lengths=self._lengths*n)
+        # 第k次重复的第j点写到 k*length+j，一次写入整个结果
+        lengths = self._lengths*n
+        data = np.zeros((self.shape[0], lengths.max()), dtype=self.dtype)
+        j = np.arange(self._data.shape[1])
+        cols = self._lengths[:,None,None]*np.arange(n)[:,None]+j
+        valid = np.broadcast_to(j < self._lengths[:,None,None], cols.shape)
+        rows = np.broadcast_to(np.arange(self.shape[0])[:,None,None], cols.shape)
+        src = np.broadcast_to(self._data[:,None,:], cols.shape)
+        data[rows[valid], cols[valid]] = src[valid]
+        return self._new(data, lengths=lengths)
+
+    def I(self):
+        return self._new(np.real(self._data))
+
+    def Q(self):
+        return self._new(np.imag(self._data))
+
+    def conj(self):
+        return self._new(np.conj(self._data))
+
+    def process(self, func, **kw):
+        '''对二维数组调用处理函数func, 输入输出都是(data,sRate)格式，func需沿最后一维处理；
+        各波形点数不同时补0部分会影响一般的处理(如IIR滤波、去直流)，此时逐个波形处理'''
+        if not self.isUniform:
+            return self._perrow(lambda wd: wd.process(func, **kw)).dense()
+        return self._process(func, **kw)
+
+    def _process(self, func, **kw):
+        '''对补0后的整个二维数组调用func，只用于结果不受补0影响的处理；
+        点数改变时认为所有波形点数相同'''
+        data, sRate = func(self._data, self._sRate, **kw)
+        data = np.asarray(data)
+        if data.shape == self._data.shape:
+            return self._new(self._masked(data, self._lengths), sRate)
+        return self._new(data, sRate, np.full(data.shape[0], data.shape[1]))
+
+    def filter(self, filter):
+        '''调用filter的process函数处理整个二维数组；
+        FIR滤波为'same'卷积，卷积核不长于各波形时不受补0影响，点数不同时也一次计算'''
+        from ._Filter import FIRFilter
+        assert hasattr(filter,'process')
+        if isinstance(filter, FIRFilter) and filter.kernal.size <= self._lengths.min():
+            return self._process(filter.process)
+        return self.process(filter.process)
+
+    def FFT(self, mode='complex', half=False, **kw):
+        '''各波形点数相同时一次计算所有FFT，否则逐个计算并返回WavedataN'''
+        if not self.isUniform:
+            return self._perrow(lambda wd: wd.FFT(mode, half, **kw))
+        return self.process(p.FFT, mode=mode, half=half, **kw)
+
+    def getFFT(self, freq, mode='complex', half=False, method='dft', **kw):
+        if not self.isUniform:
+            return super(DenseWavedataN, self).getFFT(freq, mode, half, method, **kw)
+        return p.getFFT(self._data, self._sRate, freq, mode=mode, half=half, method=method, **kw)
+
+    def resample(self, sRate, method='polyphase', **kw):
+        if sRate == self._sRate:
+            return self
+        if not self.isUniform or method == 'interp':
+            return self._perrow(lambda wd: wd.resample(sRate, method, **kw)).dense()
+        return self.process(p.resample, new_sRate=sRate, method=method, **kw)
+
+    def convolve(self, other, mode='same', norm=True, method='auto'):
+        '''所有波形与同一个卷积核卷积，mode='same'时补0部分不影响结果，可以一次计算；
+        点数不同且有波形比卷积核短时，结果点数各不相同，逐个计算'''
+        kernal = np.asarray(other.data if isinstance(other, Wavedata) else other)
+        if not self.isUniform and (mode != 'same' or kernal.size > self._lengths.min()):
+            return self._perrow(lambda wd: wd.convolve(other, mode, norm, method)).dense()
+        if norm:
+            kernal = kernal/np.sum(kernal)
+        return self._process(p.convolve, kernal=kernal, mode=mode, method=method)
+
+    def fractional_shift(self, t, method='fft', **kw):
+        ''''sinc'和'farrow'为FIR，点数不同时也一次计算；'fft'的结果与FFT长度有关，需逐个波形计算'''
+        if method == 'fft':
+            return self.process(p.fractional_shift, t=t, method=method, **kw)
+        return self._process(p.fractional_shift, t=t, method=method, **kw)
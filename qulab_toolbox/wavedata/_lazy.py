@@ -0,0 +1,184 @@
+'''Wavedata 惰性计算模块
+
+LazyWavedata 的四则运算只构建表达式树，直到访问data时才分块求值，
+所有中间结果只在块的尺度上分配，输出一次性写入同一个数组'''
+
+import numpy as np
+from functools import reduce
+from ._wavedata import Wavedata
+
+__all__ = ['LazyWavedata']
+
+
+def _node_size(node):
+    '''表达式节点的点数，常数节点为0；运算节点的点数在构建时记录，不需要遍历'''
+    kind = node[0]
+    if kind == 'data':
+        return node[1].size
+    elif kind == 'const':
+        return 0
+    else:
+        return node[3]
+
+def _leaf_eval(node, start, stop):
+    '''数据或常数节点在[start,stop)范围内的值，超出波形长度的部分补0'''
+    if node[0] == 'const':
+        return node[1]
+    arr = node[1]
+    if stop <= arr.size:
+        return arr[start:stop]
+    block = np.zeros(stop-start, dtype=arr.dtype)
+    if start < arr.size:
+        block[:arr.size-start] = arr[start:]
+    return block
+
+def _node_eval(node, start, stop):
+    '''计算表达式节点在[start,stop)范围内的值；用显式的栈后序遍历，
+    很长的运算链也不会超出Python的递归深度'''
+    values = []
+    stack = [(node, False)]
+    while stack:
+        node, ready = stack.pop()
+        if node[0] != 'op':
+            values.append(_leaf_eval(node, start, stop))
+        elif ready: # 子节点已求值，位于values末尾
+            func, n = node[1], len(node[2])
+            args = values[-n:]
+            del values[-n:]
+            values.append(func(*args) if n <= 2 else reduce(func, args))
+        else:
+            stack.append((node, True))
+            stack.extend([(c, False) for c in reversed(node[2])])
+    return values[0]
+
+
+class LazyWavedata(Wavedata):
+    '''惰性计算的Wavedata，由 Wavedata.lazy() 得到
+
+    +,-,*,/,**,负号等运算返回新的LazyWavedata，不立即计算；
+    访问data时按blocksize分块对整个表达式求值，结果会被缓存'''
+
+    blocksize = 2**16
+
+    def __init__(self, data=[], sRate=1, dtype=None, isIQ=None):
+        super(LazyWavedata, self).__init__([], sRate, isIQ=isIQ)
+        self._node = ('data', np.asarray(data, dtype=dtype))
+
+    @classmethod
+    def _from_node(cls, node, sRate):
+        wd = cls([], sRate)
+        wd._node = node
+        return wd
+
+    @property
+    def data(self):
+        '''访问时对表达式求值，并缓存结果'''
+        if self._node[0] != 'data':
+            self._node = ('data', self._evaluate())
+        return self._node[1]
+
+    @property
+    def size(self):
+        '''不求值即可得到点数'''
+        return _node_size(self._node)
+
+    @property
+    def isLazy(self):
+        '''是否还有未求值的表达式'''
+        return self._node[0] != 'data'
+
+    def _evaluate(self):
+        node = self._node
+        size = _node_size(node)
+        dtype = np.asarray(_node_eval(node, 0, 0)).dtype
+        out = np.empty(size, dtype=dtype)
+        step = int(self.blocksize)
+        for start in range(0, size, step):
+            stop = min(start+step, size)
+            out[start:stop] = _node_eval(node, start, stop)
+        return out
+
+    def lazy(self):
+        return self
+
+    def compute(self):
+        '''求值并返回普通的Wavedata类实例'''
+        return Wavedata(self.data, self.sRate)
+
+    def _operand(self, other):
+        '''把运算对象转化为表达式节点，不支持的类型返回None'''
+        if isinstance(other, LazyWavedata):
+            assert self.sRate == other.sRate
+            return other._node
+        elif isinstance(other, Wavedata):
+            assert self.sRate == other.sRate
+            return ('data', other.data)
+        elif np.isscalar(other):
+            return ('const', other)
+        else:
+            return None
+
+    def _apply(self, func, *nodes):
+        '''构建运算节点 ('op', func, 子节点, 点数)；连续的加法或乘法合并为一个多元节点，
+        循环累加的长表达式不会形成很深的树'''
+        if func in (np.add, np.multiply):
+            nodes = sum([n[2] if n[0] == 'op' and n[1] is func else (n,) for n in nodes], ())
+        size = max([_node_size(n) for n in nodes]+[0])
+        return self._from_node(('op', func, nodes, size), self.sRate)
+
+    def __neg__(self):
+        return self._apply(np.negative, self._node)
+
+    def __pow__(self, v):
+        node = self._operand(v)
+        if node is None:
+            return super(LazyWavedata, self).__pow__(v)
+        return self._apply(np.power, self._node, node)
+
+    def __add__(self, other):
+        node = self._operand(other)
+        if node is None:
+            return super(LazyWavedata, self).__add__(other)
+        return self._apply(np.add, self._node, node)
+
+    def __radd__(self, v):
+        node = self._operand(v)
+        if node is None:
+            return super(LazyWavedata, self).__radd__(v)
+        return self._apply(np.add, node, self._node)
+
+    def __sub__(self, other):
+        node = self._operand(other)
+        if node is None:
+            return super(LazyWavedata, self).__sub__(other)
+        return self._apply(np.subtract, self._node, node)
+
+    def __rsub__(self, v):
+        node = self._operand(v)
+        if node is None:
+            return super(LazyWavedata, self).__rsub__(v)
+        return self._apply(np.subtract, node, self._node)
+
+    def __mul__(self, other):
+        node = self._operand(other)
+        if node is None:
+            return super(LazyWavedata, self).__mul__(other)
+        return self._apply(np.multiply, self._node, node)
+
+    def __rmul__(self, v):
+        node = self._operand(v)
+        if node is None:
+            return super(LazyWavedata, self).__rmul__(v)
+        return self._apply(np.multiply, node, self._node)
+
+    def __truediv__(self, other):
+        node = self._operand(other)
+        if node is None:
+            return super(LazyWavedata, self).__truediv__(other)
+        return self._apply(np.true_divide, self._node, node)
+
+    def __rtruediv__(self, v):
+        node = self._operand(v)
+        if node is None:
+            return super(LazyWavedata, self).__rtruediv__(v)
+        return self._apply(np.true_divide, node, self._node)
@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.fftpack import fft,ifft
+import scipy.fft
+import scipy.signal as signal
+from scipy import interpolate
+from scipy import ndimage
+from fractions import Fraction
+from ._cache import LRUCache
 
 '''Wavedata 额外的处理模块，包含一些自定义的处理功能'''
 
@@ -18,20 +23,42 @@ def integrate(data, sRate):
 
 def derivative(data, sRate):
     '''求导，点数不变'''
-    y1=np.append(0,data[:-1])
-    y2=np.append(data[1:],0)
-    diff_data = (y2-y1)/2 #差分数据，间隔1个点做差分
+    y=np.pad(data,1) # 两端补0，保持dtype
+    diff_data = (y[2:]-y[:-2])/2 #差分数据，间隔1个点做差分
     _data = diff_data*sRate #导数，差分值除以 dt
     return _data, sRate
 
-def FFT(data, sRate, mode='amp',half=True,**kw):
-    '''FFT, 默认波形data为实数序列, 只取一半结果, 为实际物理频谱'''
-    size = len(data)
-    _sRate = size/sRate
+def FFT(data, sRate, mode='amp',half=True,workers=None,fast=False,**kw):
+    '''FFT, 默认波形data为实数序列, 只取一半结果, 为实际物理频谱；
+    data为多维数组时沿最后一维处理
+
+    Parameters:
+        mode: 'amp','phase','real','imag','complex'
+        half: 只取正频率部分，实数序列使用rfft，不计算负频率
+        workers: FFT使用的线程数，参考scipy.fft
+        fast: 为True时补零到scipy.fft.next_fast_len给出的长度，也可以直接传入n
+    '''
+    data = np.asarray(data)
+    size = data.shape[-1]
+    n = kw.pop('n', None)
+    if n is None:
+        n = scipy.fft.next_fast_len(size) if fast else size
+    _sRate = n/sRate
     # 对于实数序列的FFT，正负频率的分量是相同的
     # 对于双边谱，即包含负频率成分的，除以size N 得到实际振幅
     # 对于单边谱，即不包含负频成分，实际振幅是正负频振幅的和，所以除了0频成分其他需要再乘以2
-    fft_data = fft(data,**kw)/size
+    if half:
+        #size N为偶数时，取N/2；为奇数时，取(N+1)/2
+        index = int((n+1)/2)-1
+        if np.iscomplexobj(data):
+            fft_data = scipy.fft.fft(data,n,workers=workers,**kw)[...,:index]
+        else:
+            fft_data = scipy.fft.rfft(data,n,workers=workers,**kw)[...,:index]
+        fft_data = fft_data/size
+        fft_data[...,1:] *= 2 #非0频成分乘2
+    else:
+        fft_data = scipy.fft.fft(data,n,workers=workers,**kw)
+        fft_data /= size
     if mode in ['amp','abs']:
         _data =np.abs(fft_data)
     elif mode in ['phase','angle']:
@@ -42,9 +69,248 @@ def FFT(data, sRate, mode='amp',half=True,**kw):
         _data =np.imag(fft_data)
     elif mode == 'complex':
         _data = fft_data
-    if half:
-        #size N为偶数时，取N/2；为奇数时，取(N+1)/2
-        index = int((len(_data)+1)/2)-1
-        _data = _data[:index]
-        _data[1:] = _data[1:]*2 #非0频成分乘2
     return _data, _sRate
+
+# getFFT 'dft' 方法的复指数矩阵缓存，重复查询相同频率时只做矩阵乘法
+_dft_cache = LRUCache(maxsize=8, maxbytes=2**26)
+_dft_block = 2**16 # 矩阵元素个数超过此值时沿时间分块计算，每块共用同一个矩阵
+
+def _dft_kernal(size, f):
+    '''size个点、频率f(每点周期数)的复指数矩阵，形状(size, k)'''
+    key = (size, tuple(f))
+    kernal = _dft_cache.get(key)
+    if kernal is None:
+        # 先对相位取模，避免长序列时相位过大损失精度
+        phase = np.mod(np.outer(np.arange(size), f), 1)
+        kernal = np.exp(-2j*np.pi*phase)
+        _dft_cache.put(key, kernal)
+    return kernal
+
+def getFFT(data, sRate, freq, mode='complex', half=False, method='dft', **kw):
+    '''只计算指定频率的FFT分量，归一化与FFT一致；data为多维数组时沿最后一维批量计算
+
+    Parameters:
+        freq: 一个频率值或者频率的列表，不必位于FFT的频率格点上
+        method: 'dft' 与频率对应的复指数序列做矩阵乘法，复杂度 O(n*k)，长序列分块计算;
+                'goertzel' Goertzel递推，每个频率一次二阶IIR滤波;
+                'fft' 计算完整的FFT后取最近的频率格点，kw传给FFT
+    Return:
+        形状为 data.shape[:-1]+np.shape(freq) 的数组
+    '''
+    data = np.asarray(data)
+    freq_array = np.asarray(freq, dtype=float)
+    if method == 'fft':
+        fft_data, fft_sRate = FFT(data, sRate, mode=mode, half=half, **kw)
+        index_freq = np.around(freq_array*fft_sRate).astype(int)
+        return fft_data[...,index_freq]
+    size = data.shape[-1]
+    f = freq_array.ravel()/sRate # 每个点对应的周期数
+    if method == 'dft':
+        block = max(_dft_block//max(f.size, 1), 1024)
+        if size <= block:
+            res = np.dot(data, _dft_kernal(size, f))
+        else:
+            # 第m块的矩阵等于第0块乘以常数相位 exp(-2j*pi*f*start)
+            kernal = _dft_kernal(block, f)
+            res = 0
+            for start in range(0, size, block):
+                chunk = data[...,start:start+block]
+                shift = np.exp(-2j*np.pi*np.mod(start*f, 1))
+                res = res + np.dot(chunk, kernal[:chunk.shape[-1]])*shift
+    elif method == 'goertzel':
+        res = np.empty(data.shape[:-1]+f.shape, dtype=complex)
+        for i, _f in enumerate(f):
+            w = 2*np.pi*_f
+            s = signal.lfilter([1], [1, -2*np.cos(w), 1], data, axis=-1)
+            s1 = s[...,-1]
+            s2 = s[...,-2] if size > 1 else 0
+            res[...,i] = np.exp(-1j*w*(size-1))*(s1-np.exp(-1j*w)*s2)
+    else:
+        raise ValueError('Unknown method: %s' % method)
+    res = res/size
+    if half:
+        res = res*np.where(f == 0, 1, 2) #非0频成分乘2
+    res = res.reshape(data.shape[:-1]+freq_array.shape)
+    if mode in ['amp','abs']:
+        res = np.abs(res)
+    elif mode in ['phase','angle']:
+        res = np.angle(res,deg=True)
+    elif mode == 'real':
+        res = np.real(res)
+    elif mode == 'imag':
+        res = np.imag(res)
+    return res
+
+def _fd_taps(mu, method='sinc', halfsize=8):
+    '''分数延时FIR的系数，第q个系数作用于 x[n-m-(jmin+q)]
+
+    Return:
+        jmin, taps
+    '''
+    if method == 'farrow': # 三次拉格朗日插值，与Farrow结构等价
+        j = np.arange(-1, 3)
+        u = mu-j # 各采样点相对目标点的位置
+        taps = np.array([np.prod([-u[k]/(u[i]-u[k]) for k in range(4) if k != i])
+                         for i in range(4)])
+    elif method == 'sinc': # Hann窗截断的sinc
+        j = np.arange(-halfsize, halfsize+2)
+        taps = np.sinc(j-mu)*(0.5+0.5*np.cos(np.pi*(j-mu)/(halfsize+1)))
+        taps = taps/np.sum(taps)
+    else:
+        raise ValueError('Unknown fractional delay method: %s' % method)
+    return j[0], taps
+
+def fractional_shift(data, sRate, t=0, method='fft', halfsize=8):
+    '''分数点数的时移，t为正时向右平移，点数不变，移出部分补0；
+    data为多维数组时沿最后一维处理
+
+    Parameters:
+        t: 时移长度
+        method: 'fft' 频域线性相位，补零避免循环移位;
+                'sinc' 加窗sinc分数延时FIR, 长度为 2*halfsize+2;
+                'farrow' 4点三次拉格朗日插值
+    '''
+    data = np.asarray(data)
+    size = data.shape[-1] if data.ndim else 0
+    d = t*sRate # 延时点数
+    if d == 0 or size == 0:
+        return data, sRate
+    if method == 'fft':
+        n = scipy.fft.next_fast_len(size+int(np.ceil(abs(d)))+1)
+        if np.iscomplexobj(data):
+            k = scipy.fft.fftfreq(n)
+            spec = scipy.fft.fft(data, n)*np.exp(-2j*np.pi*k*d)
+            _data = scipy.fft.ifft(spec)[...,:size]
+        else:
+            k = scipy.fft.rfftfreq(n)
+            spec = scipy.fft.rfft(data, n)*np.exp(-2j*np.pi*k*d)
+            _data = scipy.fft.irfft(spec, n)[...,:size]
+    else:
+        m = int(np.floor(d))
+        jmin, taps = _fd_taps(d-m, method, halfsize)
+        c = signal.convolve(data, taps.reshape((1,)*(data.ndim-1)+(-1,)), method='direct')
+        idx = np.arange(size)-m-jmin
+        valid = (idx >= 0) & (idx < c.shape[-1])
+        _data = np.zeros(data.shape, dtype=np.result_type(data, taps))
+        _data[...,valid] = c[...,idx[valid]]
+    return _data.astype(np.result_type(data, 0.0), copy=False), sRate
+
+def _direct_same(data, kernal):
+    '''直接卷积，沿最后一维，结果与 np.convolve(mode='same') 对齐'''
+    if np.iscomplexobj(data) or np.iscomplexobj(kernal): # ndimage只支持实数，复数拆成实部虚部
+        dr, di = np.real(data), np.imag(data)
+        kr, ki = np.real(kernal), np.imag(kernal)
+        real = _direct_same(dr, kr)
+        if np.iscomplexobj(kernal):
+            real = real-_direct_same(di, ki) if np.iscomplexobj(data) else real
+            imag = _direct_same(dr, ki)
+            if np.iscomplexobj(data):
+                imag = imag+_direct_same(di, kr)
+        else:
+            imag = _direct_same(di, kr)
+        return real+1j*imag
+    origin = -((kernal.size+1) % 2) # 偶数长度的卷积核需要偏移一个点
+    return ndimage.convolve1d(data.astype(np.result_type(data, kernal), copy=False),
+                              kernal, axis=-1, mode='constant', origin=origin)
+
+def _conv_method(size, ksize):
+    '''根据数据和卷积核点数选择卷积方法'''
+    if ksize <= 32 or size*ksize <= 2**16:
+        return 'direct'
+    elif size >= 16*ksize:
+        return 'oa'
+    else:
+        return 'fft'
+
+def convolve(data, sRate, kernal, mode='same', method='auto'):
+    '''沿最后一维与一维卷积核卷积，结果的点数和对齐方式与np.convolve相同；
+    mode='same'时点数为 max(data点数, 卷积核点数)
+
+    Parameters:
+        kernal: 一维卷积核
+        mode: 'full', 'same', 'valid'
+        method: 'direct' 直接卷积; 'fft' FFT卷积; 'oa' 分段重叠相加FFT卷积，适合长数据短卷积核;
+                'auto' 根据点数自动选择
+    '''
+    data = np.asarray(data)
+    kernal = np.asarray(kernal).ravel()
+    size, K = data.shape[-1], kernal.size
+    if method == 'auto':
+        method = _conv_method(size, K)
+    if K > size and mode in ['same', 'valid']:
+        # 卷积核比数据长时np.convolve交换两者，由完整卷积截取，各方法结果一致
+        full, sRate = convolve(data, sRate, kernal, 'full', method)
+        start = (size-1)//2 if mode == 'same' else size-1
+        stop = start+K if mode == 'same' else K
+        return full[...,start:stop], sRate
+    if method == 'direct':
+        if mode == 'same':
+            return _direct_same(data, kernal), sRate
+        pad = [(0,0)]*(data.ndim-1)+[(K-1,K-1)]
+        c = _direct_same(np.pad(data, pad), kernal)
+        start = (K-1)-(K-1)//2
+        full = c[...,start:start+size+K-1]
+        if mode == 'full':
+            return full, sRate
+        elif mode == 'valid':
+            return full[...,K-1:size], sRate
+        raise ValueError('Unknown convolve mode: %s' % mode)
+    _kernal = kernal.reshape((1,)*(data.ndim-1)+(-1,))
+    if method == 'fft':
+        _data = signal.fftconvolve(data, _kernal, mode=mode, axes=-1)
+    elif method == 'oa':
+        _data = signal.oaconvolve(data, _kernal, mode=mode, axes=-1)
+    else:
+        raise ValueError('Unknown convolve method: %s' % method)
+    return _data, sRate
+
+def _rational(ratio, maxden=1000):
+    '''判断采样率之比是否为分子分母都不超过maxden的有理数，是则返回(up,down)，否则返回None'''
+    frac = Fraction(ratio).limit_denominator(maxden)
+    if frac.numerator > maxden or abs(frac.numerator/frac.denominator-ratio) > 1e-12*ratio:
+        return None
+    return frac.numerator, frac.denominator
+
+def resample(data, sRate, new_sRate, method='polyphase', maxden=1000, align=True, kind='linear'):
+    '''改变采样率重新采样，沿最后一维处理，输出点数为 round(size*new_sRate/sRate)
+
+    Parameters:
+        new_sRate: 新的采样率
+        method: 'polyphase' 采样率之比为有理数 up/down (不超过maxden) 时使用多相滤波器，
+                    自带抗混叠滤波，否则自动改用'fft';
+                'fft' 频域重采样，适用于任意比例，假设波形周期延拓;
+                'interp' 插值重采样，与high_resample/low_resample相同，kind为插值类型
+        align: 'polyphase'/'fft' 的结果以第一个采样点为时间起点，
+                align为True时对齐到本模块采样点位于每个间隔中心的约定
+    '''
+    data = np.asarray(data)
+    size = data.shape[-1]
+    new_size = int(np.around(size*new_sRate/sRate))
+    if new_sRate == sRate:
+        return data, sRate
+    if method == 'interp':
+        dt = 1/sRate
+        x = np.arange(size+2)*dt-dt/2
+        pad = [(0,0)]*(data.ndim-1)+[(1,1)]
+        y = np.pad(data, pad)
+        new_x = (np.arange(new_size)+0.5)/new_sRate
+        func = interpolate.interp1d(x, y, kind=kind, axis=-1,
+                                    bounds_error=False, fill_value=0)
+        return func(new_x).astype(np.result_type(data, 0.0), copy=False), new_sRate
+    updown = _rational(new_sRate/sRate, maxden) if method == 'polyphase' else None
+    if updown is not None:
+        up, down = updown
+        _data = signal.resample_poly(data, up, down, axis=-1)
+        if _data.shape[-1] >= new_size:
+            _data = _data[...,:new_size]
+        else:
+            pad = [(0,0)]*(data.ndim-1)+[(0,new_size-_data.shape[-1])]
+            _data = np.pad(_data, pad)
+    elif method in ['polyphase', 'fft']:
+        _data = signal.resample(data, new_size, axis=-1)
+    else:
+        raise ValueError('Unknown resample method: %s' % method)
+    if align:
+        # 第j个点实际对应的时间为 0.5/sRate+j/new_sRate，平移到 (j+0.5)/new_sRate
+        _data, _ = fractional_shift(_data, new_sRate, 0.5/sRate-0.5/new_sRate)
+    return _data.astype(np.result_type(data, 0.0), copy=False), new_sRate
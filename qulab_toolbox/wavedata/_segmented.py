@@ -0,0 +1,261 @@
+'''Wavedata 分段稀疏模块
+
+SegmentedWavedata 只保存非零的数据块 (start, block)，其余部分隐含为0，
+适合大部分时间为空的控制波形，需要时再转化为稠密数据'''
+
+import numpy as np
+from ._wavedata import Wavedata
+
+__all__ = ['SegmentedWavedata']
+
+
+def _runs(data, mingap=16):
+    '''返回非零数据段的起止点，间隔小于mingap的零点并入相邻数据段'''
+    nonzero = np.flatnonzero(data)
+    if nonzero.size == 0:
+        return []
+    gap = np.flatnonzero(np.diff(nonzero) > mingap)
+    starts = np.append(nonzero[0], nonzero[gap+1])
+    stops = np.append(nonzero[gap], nonzero[-1])+1
+    return list(zip(starts, stops))
+
+def _result_type(*args):
+    '''数据块很多时只对不同的dtype求公共类型'''
+    return np.result_type(*set([np.asarray(v).dtype for v in args]))
+
+def _merge(segments, dtype):
+    '''合并重叠或相邻的数据段，重叠部分相加'''
+    segments = sorted(segments, key=lambda seg: seg[0])
+    groups = []
+    for start, block in segments:
+        stop = start+block.size
+        if groups and start <= groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], stop)
+            groups[-1][2].append((start, block))
+        else:
+            groups.append([start, stop, [(start, block)]])
+    merged = []
+    for start, stop, members in groups:
+        if len(members) == 1:
+            merged.append((start, members[0][1]))
+            continue
+        block = np.zeros(stop-start, dtype=dtype)
+        for s, b in members:
+            block[s-start:s-start+b.size] += b
+        merged.append((start, block))
+    return merged
+
+
+class SegmentedWavedata(Wavedata):
+    '''分段稀疏的Wavedata
+
+    只保存非零数据块，支持与Wavedata相同的运算；
+    +/- 合并重叠的数据段，* 只计算数据段相交的部分，
+    访问data时才生成稠密数组(不缓存)，也可以用densify转化为Wavedata'''
+
+    def __init__(self, data=[], sRate=1, dtype=None, isIQ=None, mingap=16):
+        '''给定稠密序列，提取其中的非零数据段；isIQ只为兼容Wavedata的参数，不使用'''
+        super(SegmentedWavedata, self).__init__([], sRate)
+        data = np.asarray(data, dtype=dtype)
+        self._size = data.size
+        self._dtype = np.result_type(data, 0.0)
+        self._segments = [(int(start), data[start:stop].copy())
+                          for start, stop in _runs(data, mingap)]
+
+    @classmethod
+    def from_segments(cls, segments, size, sRate=1, dtype=None):
+        '''由 (起始点, 数据块) 的列表构造，重叠部分相加，超出size的部分截去'''
+        segments = [(int(start), np.asarray(block)) for start, block in segments]
+        if dtype is None:
+            dtype = _result_type(0.0, *[block for _, block in segments])
+        _segments = []
+        for start, block in segments:
+            stop = min(start+block.size, size)
+            _start = max(start, 0)
+            if stop <= _start:
+                continue
+            _segments.append((_start, block[_start-start:stop-start]))
+        wd = cls([], sRate)
+        wd._size = int(size)
+        wd._dtype = np.dtype(dtype)
+        wd._segments = _merge(_segments, dtype)
+        return wd
+
+    @classmethod
+    def blank(cls, width=0, sRate=1e2, dtype=float):
+        '''全零波形，不占用数据内存'''
+        size = np.around(width*sRate).astype(int)
+        return cls.from_segments([], size, sRate, dtype)
+
+    def _new(self, segments, size=None, dtype=None):
+        if size is None:
+            size = self._size
+        if dtype is None:
+            dtype = _result_type(np.zeros(0, self._dtype), *[block for _, block in segments])
+        return self.from_segments(segments, size, self.sRate, dtype)
+
+    @property
+    def segments(self):
+        '''非零数据段列表 [(起始点, 数据块), ...]'''
+        return list(self._segments)
+
+    @property
+    def nnz(self):
+        '''实际保存的点数'''
+        return sum([block.size for _, block in self._segments])
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def data(self):
+        '''生成稠密数据'''
+        data = np.zeros(self._size, dtype=self._dtype)
+        for start, block in self._segments:
+            data[start:start+block.size] = block
+        return data
+
+    @property
+    def isComplex(self):
+        return self._dtype.kind == 'c'
+
+    @property
+    def isIQ(self):
+        if not self.isComplex:
+            return False
+        return any([np.any(np.imag(block)) for _, block in self._segments])
+
+    def densify(self):
+        '''转化为稠密的Wavedata类实例'''
+        return Wavedata(self.data, self.sRate)
+
+    def copy(self):
+        return self._new([(start, block.copy()) for start, block in self._segments])
+
+    def _map(self, func):
+        '''对每个数据段作用保持0不变的函数'''
+        segments = [(start, func(block)) for start, block in self._segments]
+        dtype = np.asarray(func(np.zeros(0, self._dtype))).dtype
+        return self._new(segments, dtype=dtype)
+
+    def I(self):
+        return self._map(np.real)
+
+    def Q(self):
+        return self._map(np.imag)
+
+    def __neg__(self):
+        return self._map(np.negative)
+
+    def __abs__(self):
+        return self._map(np.abs)
+
+    def __pow__(self, v):
+        if np.isscalar(v) and np.real(v) > 0:
+            return self._map(lambda block: block**v)
+        return super(SegmentedWavedata, self).__pow__(v)
+
+    def append(self, left=0, right=0):
+        left = np.around(left).astype(int)
+        right = np.around(right).astype(int)
+        segments = [(start+left, block) for start, block in self._segments]
+        return self._new(segments, size=self._size+left+right)
+
+    def setRange(self, a, b):
+        a = np.around(a).astype(int)
+        b = np.around(b).astype(int)
+        a, b, _ = slice(a, b).indices(self._size)
+        b = max(a, b)
+        segments = [(start-a, block) for start, block in self._segments]
+        return self._new(segments, size=b-a)
+
+    def __rshift__(self, t):
+        t=float(t)
+        if abs(t)>self.len:
+            raise TypeError('shift is too large !')
+        n = np.around(t*self.sRate).astype(int)
+        segments = [(start+n, block) for start, block in self._segments]
+        return self._new(segments)
+
+    @classmethod
+    def concat(cls, wd_list, sRate=None):
+        wd_list = list(wd_list)
+        if sRate is None:
+            assert len(wd_list) > 0
+            sRate = wd_list[0].sRate
+        segments, size = [], 0
+        for wd in wd_list:
+            assert wd.sRate == sRate
+            if not isinstance(wd, SegmentedWavedata):
+                wd = cls(wd.data, sRate)
+            segments.extend([(start+size, block) for start, block in wd._segments])
+            size += wd.size
+        return cls.from_segments(segments, size, sRate)
+
+    def __add__(self, other):
+        '''与SegmentedWavedata相加时合并数据段；与稠密Wavedata或非零数值相加返回Wavedata'''
+        if isinstance(other, SegmentedWavedata):
+            assert self.sRate == other.sRate
+            return self._new(self._segments+other._segments,
+                             size=max(self._size, other._size),
+                             dtype=np.result_type(self._dtype, other._dtype))
+        elif isinstance(other, Wavedata):
+            assert self.sRate == other.sRate
+            size = max(self._size, other.size)
+            data = np.zeros(size, dtype=np.result_type(self._dtype, other.data))
+            data[:other.size] = other.data
+            for start, block in self._segments:
+                data[start:start+block.size] += block
+            return Wavedata(data, self.sRate)
+        elif np.isscalar(other):
+            if other == 0:
+                return self
+            return Wavedata(self.data+other, self.sRate)
+        else:
+            return super(SegmentedWavedata, self).__add__(other)
+
+    def __radd__(self, v):
+        return self.__add__(v)
+
+    def __mul__(self, other):
+        '''与Wavedata相乘时只计算数据段部分；与数值相乘缩放各数据段'''
+        if isinstance(other, SegmentedWavedata):
+            assert self.sRate == other.sRate
+            segments = []
+            i, j = 0, 0
+            A, B = self._segments, other._segments
+            while i < len(A) and j < len(B):
+                (sa, ba), (sb, bb) = A[i], B[j]
+                start = max(sa, sb)
+                stop = min(sa+ba.size, sb+bb.size)
+                if start < stop:
+                    segments.append((start, ba[start-sa:stop-sa]*bb[start-sb:stop-sb]))
+                if sa+ba.size < sb+bb.size:
+                    i += 1
+                else:
+                    j += 1
+            return self._new(segments, size=max(self._size, other._size),
+                             dtype=np.result_type(self._dtype, other._dtype))
+        elif isinstance(other, Wavedata):
+            assert self.sRate == other.sRate
+            other_data = other.data
+            segments = []
+            for start, block in self._segments:
+                stop = min(start+block.size, other.size)
+                if start < stop:
+                    segments.append((start, block[:stop-start]*other_data[start:stop]))
+            return self._new(segments, size=max(self._size, other.size),
+                             dtype=np.result_type(self._dtype, other_data))
+        elif np.isscalar(other):
+            return self._map(lambda block: block*other)
+        else:
+            return super(SegmentedWavedata, self).__mul__(other)
+
+    def __rmul__(self, v):
+        return self.__mul__(v)
+
+    def __truediv__(self, other):
+        if np.isscalar(other):
+            return self._map(lambda block: block/other)
+        return super(SegmentedWavedata, self).__truediv__(other)
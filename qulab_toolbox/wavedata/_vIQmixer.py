@@ -1,8 +1,9 @@
 '''Wavedata 虚拟IQ混频器模块'''
 
 import numpy as np
-from ._wavedata import Wavedata
-from ._wd_func import Exp,Sin,Cos
+from ._wavedata import Wavedata, WavedataN
+from ._dense import DenseWavedataN
+from ._NCO import carrier
 
 __all__ = ['vIQmixer']
 
@@ -60,8 +61,11 @@ class vIQmixer(object):
     def UpConversion(self):
         '''需要先 set_IQ, set_LO, set_Cali, 再使用此方法'''
         cali_phi_i, cali_phi_q = self._cali_phi
-        rf_wd = self.__IQ.I() * Cos(2*np.pi*self.LO_freq,cali_phi_i,self.len,self.sRate) - \
-                self.__IQ.Q() * Sin(2*np.pi*self.LO_freq,cali_phi_q,self.len,self.sRate)
+        size = self.__IQ.size
+        # 载波表按参数缓存，重复上变频时不再重新计算
+        cos_wd = Wavedata(carrier(self.LO_freq,size,self.sRate,cali_phi_i,'cos'),self.sRate)
+        sin_wd = Wavedata(carrier(self.LO_freq,size,self.sRate,cali_phi_q,'sin'),self.sRate)
+        rf_wd = self.__IQ.I() * cos_wd - self.__IQ.Q() * sin_wd
         self._RF = rf_wd
         return self
 
@@ -84,14 +88,57 @@ class vIQmixer(object):
         return vIQ._RF
 
     @classmethod
-    def carry_wave(cls,carry_freq=0,I=0,Q=0,IQ=None,phase=0,carry_cali=None,DEG=True):
+    def up_conversion_batch(cls,LO_freq,IQ,sRate=None,cali_array=None,cali_rf=None,DEG=True):
+        '''多通道一次上变频，等价于对每个通道调用up_conversion
+
+        Parameters:
+            LO_freq: 各通道的本振频率，数值或 (通道数,) 的序列
+            IQ: (通道数, 点数) 的复数数组，或WavedataN/DenseWavedataN
+            sRate: 采样率，IQ为数组时需要指定
+            cali_array: 2x3 或 (通道数,2,3) 的校准矩阵，格式与set_Cali相同
+            cali_rf: 1x2 或 (通道数,2) 的RF线性校准，格式与set_CaliRF相同
+        Return:
+            DenseWavedataN，每行为对应通道的RF波形
+
+        I*cos(wt+phi_I)-Q*sin(wt+phi_Q) = Re[exp(1j*wt)*(I*exp(1j*phi_I)+1j*Q*exp(1j*phi_Q))]，
+        只需要一张复数载波表和一次复数乘法'''
+        lengths=None
+        if isinstance(IQ,WavedataN):
+            IQ=IQ.dense()
+            data,sRate,lengths=IQ.data,IQ.sRate,IQ.lengths
+        else:
+            data=np.atleast_2d(IQ)
+        channels,size=data.shape
+        LO=np.broadcast_to(np.asarray(LO_freq,dtype=float),(channels,))
+        if cali_array is None:
+            cali_array=[[1,0,0],[1,0,0]]
+        _cali=np.broadcast_to(np.asarray(cali_array,dtype=float),(channels,2,3))
+        scale,offset=_cali[:,:,0,None],_cali[:,:,1,None]
+        phi=_cali[:,:,2,None]*np.pi/180 if DEG else _cali[:,:,2,None]
+        I=scale[:,0]*np.real(data)+offset[:,0]
+        Q=scale[:,1]*np.imag(data)+offset[:,1]
+        if lengths is not None: # 各通道长度不同时，超出长度的部分不加offset
+            valid=np.arange(size) < lengths[:,None]
+            I,Q=I*valid,Q*valid
+        # 载波表按参数缓存，扫描中本振不变时直接复用
+        lo=carrier(LO,size,sRate)
+        # 展开为实数运算，避免生成复数的中间数组
+        rf=lo.real*(I*np.cos(phi[:,0])-Q*np.sin(phi[:,1]))-lo.imag*(I*np.sin(phi[:,0])+Q*np.cos(phi[:,1]))
+        if cali_rf is not None:
+            _cali_rf=np.broadcast_to(np.asarray(cali_rf,dtype=float),(channels,2))
+            rf=_cali_rf[:,0,None]*rf+_cali_rf[:,1,None]
+        return DenseWavedataN(rf,sRate,lengths)
+
+    @classmethod
+    def carry_wave(cls,carry_freq=0,I=0,Q=0,IQ=None,phase=0,carry_cali=None,DEG=True,method='fft'):
         '''将I/Q分别加载某个频率的载波，
-        carry_cali对应实体IQ混频器的校准矩阵，与上面cali_array格式相同'''
+        carry_cali对应实体IQ混频器的校准矩阵，与上面cali_array格式相同；
+        method为相位校准的时移方法，参考Wavedata.fractional_shift'''
         if IQ is None:
             IQ=I+1j*Q
         # 理想情况下的载波IQ, 未校准
         phase = phase*np.pi/180 if DEG else phase
-        carry_IQ = IQ*Exp(2*np.pi*carry_freq,phase,IQ.len,IQ.sRate)
+        carry_IQ = IQ*Wavedata(carrier(carry_freq,IQ.size,IQ.sRate,phase),IQ.sRate)
 
         if carry_cali is None:
             return carry_IQ
@@ -107,11 +154,9 @@ class vIQmixer(object):
             shift_I = _phi_I/(2*np.pi*carry_freq) if not carry_freq==0 else 0
             shift_Q = _phi_Q/(2*np.pi*carry_freq) if not carry_freq==0 else 0
 
-            # 相位校准，将原插值函数平移后重新采样
-            func_I = lambda x: carry_IQ.I().timeFunc(kind='cubic')(x+shift_I)
-            carry_I = Wavedata.init(func_I,(0,IQ.len),IQ.sRate)
-            func_Q = lambda x: carry_IQ.Q().timeFunc(kind='cubic')(x+shift_Q)
-            carry_Q = Wavedata.init(func_Q,(0,IQ.len),IQ.sRate)
+            # 相位校准，将I/Q分别提前shift
+            carry_I = carry_IQ.I().fractional_shift(-shift_I, method=method)
+            carry_Q = carry_IQ.Q().fractional_shift(-shift_Q, method=method)
 
             # 进行振幅校准
             carry_I = carry_I*_scale_I+_offset_I
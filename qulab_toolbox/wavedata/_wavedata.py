@@ -1,17 +1,57 @@
+import weakref
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import interpolate
-from scipy.fftpack import fft,ifft
+from ._cache import LRUCache
+from . import _process as p
 
-__all__ = ['Wavedata', 'WavedataN']
+__all__ = ['Wavedata', 'WavedataN', 'WavedataBuilder']
+
+def _zeropad(data, size):
+    '''在末尾补0到size个点，保持dtype；点数已足够时不复制'''
+    if data.size == size:
+        return data
+    _data = np.zeros(size, dtype=np.result_type(data, 0.0))
+    _data[:data.size] = data
+    return _data
+
+def _IQhint2(a, b):
+    '''两个实数波形运算的结果仍为实数，其他情况未知'''
+    if a._IQhint() is False and b._IQhint() is False:
+        return False
+    return None
+
+def _IQhint_scalar(wd, v):
+    '''波形与数值v运算：只沿用已知为实数的状态，v为复数或乘以0等情况均视为未知'''
+    if np.isrealobj(v) and wd._IQhint() is False:
+        return False
+    return None
+
+def _readonly(view):
+    '''将共享内存的切片设为只读，避免通过视图修改原波形'''
+    view.flags.writeable = False
+    return view
+
+def _drop_interp(cache, kinds, key):
+    '''波形被回收时移除它的所有插值函数'''
+    for kind in kinds.pop(key, ()):
+        cache.pop((key, kind))
 
 class Wavedata(object):
 
-    def __init__(self, data = [], sRate = 1):
-        '''给定序列和采样率，构造Wavedata'''
-        self.__data = np.asarray(data)#.flatten()
+    # timeFunc插值函数的缓存，以(id(wd),kind)为键，波形被回收时自动移除；
+    # 插值函数保存x、y的副本和样条系数，按点数估计占用的字节数，总共不超过256MiB
+    interpCache = LRUCache(maxsize=32, maxbytes=2**28)
+    # 已注册回收回调的波形 id(wd) -> 缓存过的kind集合，每个波形只注册一次
+    _interpKinds = {}
+
+    def __init__(self, data = [], sRate = 1, dtype = None, isIQ = None):
+        '''给定序列和采样率，构造Wavedata；dtype可指定数据类型，如float32/complex64；
+        isIQ为已知的IQ状态，None表示未知，在第一次访问isIQ时计算'''
+        self.__data = np.asarray(data, dtype=dtype)#.flatten()
         # assert self.__data.ndim==1
         self.__sRate = sRate
+        self.__isIQ = isIQ
 
     @property
     def data(self):
@@ -24,26 +64,43 @@ class Wavedata(object):
         return self.__sRate
 
     @staticmethod
-    def generateData(timeFunc, domain=(0,1), sRate=1e2):
-        '''给定函数、定义域、采样率，生成data序列'''
+    def generateData(timeFunc, domain=(0,1), sRate=1e2, dtype=None):
+        '''给定函数、定义域、采样率，生成data序列；
+        时间序列总是以float64计算，结果再转为dtype'''
         length = np.around(abs(domain[1]-domain[0]) * sRate).astype(int) / sRate
         _domain = min(domain), (min(domain)+length)
         dt = 1/sRate
         _timeFunc = lambda x: timeFunc(x) * (x > _domain[0]) * ( x < _domain[1])
         x = np.arange(_domain[0]+dt/2, _domain[1], dt)
-        data = np.array(_timeFunc(x))
+        data = np.asarray(_timeFunc(x), dtype=dtype)
         return data
 
     @classmethod
-    def init(cls, timeFunc, domain=(0,1), sRate=1e2):
+    def init(cls, timeFunc, domain=(0,1), sRate=1e2, dtype=None):
         '''给定函数、定义域、采样率，生成Wavedata类'''
-        data = cls.generateData(timeFunc,domain,sRate)
+        data = cls.generateData(timeFunc,domain,sRate,dtype)
         return cls(data,sRate)
 
+    @property
+    def isComplex(self):
+        '''data是否为复数类型，只检查dtype；为True而isIQ为False时表示复数类型但虚部全为0'''
+        return np.iscomplexobj(self.data)
+
     @property
     def isIQ(self):
-        '''是否为IQ类型 即data是否包含复数'''
-        return np.any(np.iscomplex(self.data))
+        '''是否为IQ类型 即data是否包含复数；
+        实数类型直接返回False，复数类型只扫描一次，结果随实例缓存'''
+        if not self.isComplex:
+            return False
+        if self.__isIQ is None:
+            self.__isIQ = bool(np.any(np.imag(self.data)))
+        return self.__isIQ
+
+    def _IQhint(self):
+        '''已知的IQ状态，不触发扫描，未知时返回None'''
+        if not self.isComplex:
+            return False
+        return self.__isIQ
 
     @property
     def x(self):
@@ -54,7 +111,7 @@ class Wavedata(object):
 
     @property
     def f(self): # 支持复数与timeFunc一致
-        '''返回根据属性data进行cubic类型插值得到的时间函数'''
+        '''返回根据属性data进行cubic类型插值得到的时间函数，使用缓存'''
         f = self.timeFunc(kind='cubic')
         return f
 
@@ -73,6 +130,11 @@ class Wavedata(object):
         else:
             raise AttributeError('No such attribute!')
 
+    def lazy(self):
+        '''返回惰性计算的LazyWavedata，之后的运算在访问data时一次性分块求值'''
+        from ._lazy import LazyWavedata
+        return LazyWavedata(self.data, self.sRate)
+
     def I(self):
         '''I波形 返回Wavedata类'''
         wd = self.__class__(np.real(self.data), self.sRate)
@@ -99,11 +161,31 @@ class Wavedata(object):
             data = np.conj(self.data)
         elif mode == 'exchange': #交换实部和虚部
             data = 1j*np.conj(self.data)
-        wd = self.__class__(data, self.sRate)
+        isIQ = self._IQhint() if mode in ['self','conj'] else None
+        wd = self.__class__(data, self.sRate, isIQ=isIQ)
         return wd
 
-    def timeFunc(self,kind='cubic'):
-        '''返回波形插值得到的时间函数，默认cubic插值'''
+    def timeFunc(self,kind='cubic',cache=True):
+        '''返回波形插值得到的时间函数，默认cubic插值；
+        cache为True时，同一个波形相同kind的插值函数只生成一次，
+        缓存假设data在波形的生命周期内不被原地修改'''
+        if not cache:
+            return self._timeFunc(kind)
+        key = (id(self), kind)
+        cached = self.interpCache.get(key)
+        if cached is not None and cached[0]() is self:
+            return cached[1]
+        _timeFunc = self._timeFunc(kind)
+        nbytes = 32*(self.size+2)*(2 if self.isIQ else 1) # x、y副本和样条系数约为原数据的4倍
+        self.interpCache.put(key, (weakref.ref(self), _timeFunc), nbytes)
+        kinds = self._interpKinds.get(id(self))
+        if kinds is None: # 第一次缓存此波形，注册一次回收回调
+            kinds = self._interpKinds[id(self)] = set()
+            weakref.finalize(self, _drop_interp, self.interpCache, self._interpKinds, id(self))
+        kinds.add(kind)
+        return _timeFunc
+
+    def _timeFunc(self,kind='cubic'):
         #为了更好地插值，在插值序列x/y前后各加一个点，增大插值范围
         dt = 1/self.sRate
         x = np.arange(-dt/2, self.len+dt, dt)
@@ -129,12 +211,12 @@ class Wavedata(object):
         Return:
             一个新的Wavedata类实例'''
         left = np.around(left).astype(int)
-        append_left=np.zeros(left)
-        _data = np.append(append_left, self.data)
         right = np.around(right).astype(int)
-        append_right=np.zeros(right)
-        data = np.append(_data, append_right)
-        wd = self.__class__(data, self.sRate)
+        if left == 0 and right == 0:
+            return self.__class__(_readonly(self.data[:]), self.sRate, isIQ=self._IQhint())
+        data = np.zeros(left+self.size+right, dtype=np.result_type(self.data, 0.0))
+        data[left:left+self.size] = self.data
+        wd = self.__class__(data, self.sRate, isIQ=self._IQhint())
         return wd
 
     def appendLen(self,left=0,right=0):
@@ -150,11 +232,14 @@ class Wavedata(object):
         return self.append(left,right)
 
     def setRange(self,a,b):
-        '''设置波形点数范围，与切片规则一致'''
+        '''设置波形点数范围，与切片规则一致；
+        返回的波形与原波形共享内存，为只读视图，需要独立数据时使用copy'''
         a = np.around(a).astype(int)
         b = np.around(b).astype(int)
-        data=self.data[a:b]
-        wd = self.__class__(data, self.sRate)
+        data=_readonly(self.data[a:b])
+        # 实数波形的片段仍为实数，IQ波形的片段需要重新判断
+        isIQ = False if self._IQhint() is False else None
+        wd = self.__class__(data, self.sRate, isIQ=isIQ)
         return wd
 
     def setRangeLen(self,a,b):
@@ -191,6 +276,11 @@ class Wavedata(object):
         size = np.around(length*self.sRate).astype(int)
         return self.setSize(size)
 
+    def copy(self):
+        '''返回数据独立的波形副本'''
+        wd = self.__class__(np.array(self.data), self.sRate, isIQ=self._IQhint())
+        return wd
+
     def __len__(self):
         '''len(wd) 返回点数'''
         return self.size
@@ -207,7 +297,7 @@ class Wavedata(object):
 
     def __neg__(self):
         '''负 -wd'''
-        wd = self.__class__(-self.data, self.sRate)
+        wd = self.__class__(-self.data, self.sRate, isIQ=self._IQhint())
         return wd
 
     def __abs__(self):
@@ -221,37 +311,62 @@ class Wavedata(object):
         if abs(t)>self.len:
             raise TypeError('shift is too large !')
         n = np.around(abs(t)*self.sRate).astype(int)
-        shift_data = np.zeros(n)
+        if n == 0:
+            return self.__class__(_readonly(self.data[:]), self.sRate, isIQ=self._IQhint())
+        # 预分配后直接写入，只复制一次
+        data = np.zeros(self.size, dtype=np.result_type(self.data, 0.0))
         left_n = self.size-n
         if t>0:
-            data = np.append(shift_data, self.data[:left_n])
+            data[n:] = self.data[:left_n]
         else:
-            data = np.append(self.data[-left_n:], shift_data)
-        wd = self.__class__(data, self.sRate)
+            data[:left_n] = self.data[n:]
+        isIQ = False if self._IQhint() is False else None
+        wd = self.__class__(data, self.sRate, isIQ=isIQ)
         return wd
 
+    def fractional_shift(self, t, method='fft', **kw):
+        '''支持非整数点数的时移 t为正时向右平移，点数不变，移出部分补0
+
+        Parameters:
+            t: 时移长度
+            method: 'fft' 频域线性相位；'sinc' 加窗sinc分数延时FIR；
+                    'farrow' 4点三次拉格朗日插值
+        '''
+        return self.process(p.fractional_shift, t=t, method=method, **kw)
+
     def __lshift__(self, t):
         '''左移 wd<<t 长度不变'''
         t=float(t)
         return self >> (-t)
 
+    @classmethod
+    def concat(cls, wd_list, sRate=None):
+        '''串联多个波形，预分配内存后一次性写入，耗时与总点数成线性关系
+
+        Parameters:
+            wd_list: Wavedata类实例的列表
+            sRate: 采样率，默认取第一个波形的采样率；列表为空时必须指定
+        Return:
+            一个新的Wavedata类实例'''
+        wd_list = list(wd_list)
+        if sRate is None:
+            assert len(wd_list) > 0
+            sRate = wd_list[0].sRate
+        builder = WavedataBuilder(sRate).extend(wd_list)
+        return builder.build(cls)
+
     def __or__(self, other):
         '''或 wd|o 串联波形'''
         assert isinstance(other,Wavedata)
         assert self.sRate == other.sRate
-        data = np.append(self.data,other.data)
-        wd = self.__class__(data, self.sRate)
-        return wd
+        return self.__class__.concat([self, other])
 
     def __xor__(self, n):
         '''异或 wd^n 串联n个波形，n<=0时输出空波形'''
         n = np.around(n).astype(int)
         if n <= 0:
-            data=[]
-        else:
-            data = list(self.data)*n
-        wd = self.__class__(data, self.sRate)
-        return wd
+            return self.__class__([], self.sRate)
+        return self.__class__.concat([self]*n)
 
     def __pow__(self, v):
         '''幂 wd**v 波形值的v次幂'''
@@ -267,10 +382,10 @@ class Wavedata(object):
         if isinstance(other,Wavedata):
             assert self.sRate == other.sRate
             size = max(self.size, other.size)
-            data_self = np.append(self.data, np.zeros(size-self.size))
-            data_other = np.append(other.data, np.zeros(size-other.size))
+            data_self = _zeropad(self.data, size)
+            data_other = _zeropad(other.data, size)
             data = data_self + data_other
-            wd = self.__class__(data, self.sRate)
+            wd = self.__class__(data, self.sRate, isIQ=_IQhint2(self, other))
             return wd
         else:
             return other + self
@@ -281,7 +396,7 @@ class Wavedata(object):
             other/v: 可以为Wavedata类或者数值；如果为np.ndarray，则会造成另一种行为
         '''
         data = self.data + v
-        wd = self.__class__(data, self.sRate)
+        wd = self.__class__(data, self.sRate, isIQ=_IQhint_scalar(self, v))
         return wd
 
     def __sub__(self, other):
@@ -306,10 +421,10 @@ class Wavedata(object):
         if isinstance(other,Wavedata):
             assert self.sRate == other.sRate
             size = max(self.size, other.size)
-            data_self = np.append(self.data, np.zeros(size-self.size))
-            data_other = np.append(other.data, np.zeros(size-other.size))
+            data_self = _zeropad(self.data, size)
+            data_other = _zeropad(other.data, size)
             data = data_self * data_other
-            wd = self.__class__(data, self.sRate)
+            wd = self.__class__(data, self.sRate, isIQ=_IQhint2(self, other))
             return wd
         else:
             return other * self
@@ -320,7 +435,7 @@ class Wavedata(object):
             other/v: 可以为Wavedata类或者数值；如果为np.ndarray，则会造成另一种行为
         '''
         data = self.data * v
-        wd = self.__class__(data, self.sRate)
+        wd = self.__class__(data, self.sRate, isIQ=_IQhint_scalar(self, v))
         return wd
 
     def __truediv__(self, other):
@@ -331,8 +446,8 @@ class Wavedata(object):
         if isinstance(other,Wavedata):
             assert self.sRate == other.sRate
             size = max(self.size, other.size)
-            data_self = np.append(self.data, np.zeros(size-self.size))
-            data_other = np.append(other.data, np.zeros(size-other.size))
+            data_self = _zeropad(self.data, size)
+            data_other = _zeropad(other.data, size)
             data = data_self / data_other
             wd = self.__class__(data, self.sRate)
             return wd
@@ -348,10 +463,11 @@ class Wavedata(object):
         wd = self.__class__(data, self.sRate)
         return wd
 
-    def convolve(self, other, mode='same', norm=True):
+    def convolve(self, other, mode='same', norm=True, method='auto'):
         '''卷积
         Parameters:
             mode: full, same, valid
+            method: direct, fft, oa(重叠相加), auto(根据点数自动选择)
         '''
         if isinstance(other,Wavedata):
             _kernal = other.data
@@ -362,46 +478,21 @@ class Wavedata(object):
             kernal = _kernal / k_sum   #归一化kernal，使卷积后的波形总幅度不变
         else:
             kernal = _kernal
-        data = np.convolve(self.data,kernal,mode)
-        wd = self.__class__(data, self.sRate)
+        wd = self.process(p.convolve, kernal=kernal, mode=mode, method=method)
         return wd
 
-    def FFT(self, mode='complex', half=False, **kw): # 支持复数，需做调整
+    def FFT(self, mode='complex', half=False, **kw): # 支持复数
         '''FFT, 默认形式为直接FFT变换；
-        data为实数序列, 可以只取一半结果, 为实际物理频谱'''
-        sRate = self.size/self.sRate
-        # 对于实数序列的FFT，正负频率的分量是相同的
-        # 对于双边谱，即包含负频率成分的，除以size N 得到实际振幅
-        # 对于单边谱，即不包含负频成分，实际振幅是正负频振幅的和，
-        # 所以除了0频成分其他需要再乘以2
-        fft_data = fft(self.data,**kw)/self.size
-        if mode in ['amp','abs']:
-            data = np.abs(fft_data)
-        elif mode in ['phase','angle']:
-            data = np.angle(fft_data,deg=True)
-        elif mode == 'real':
-            data = np.real(fft_data)
-        elif mode == 'imag':
-            data = np.imag(fft_data)
-        elif mode == 'complex':
-            data = fft_data
-        if half:
-            #size N为偶数时，取N/2；为奇数时，取(N+1)/2
-            index = int((len(data)+1)/2)-1
-            data = data[:index]
-            data[1:] = data[1:]*2 #非0频成分乘2
-        wd = self.__class__(data, sRate)
-        return wd
+        data为实数序列, 可以只取一半结果, 为实际物理频谱，此时使用rfft；
+        kw可传入workers(线程数)、fast(补零到快速FFT长度)、n等，参考_process.FFT'''
+        return self.process(p.FFT, mode=mode, half=half, **kw)
 
-    def getFFT(self,freq,mode='complex',half=False,**kw):
+    def getFFT(self,freq,mode='complex',half=False,method='dft',**kw):
         ''' 获取指定频率的FFT分量；
-        freq: 为一个频率值或者频率的列表，
+        freq: 为一个频率值或者频率的列表，可以不在FFT的频率格点上，
+        method: 'dft'/'goertzel' 只计算所需的频率，'fft' 计算完整FFT后取最近的格点，
         返回值: 是对应mode的一个值或列表'''
-        freq_array=np.array(freq)
-        fft_wd = self.FFT(mode=mode,half=half,**kw)
-        index_freq = np.around(freq_array*fft_wd.sRate).astype(int)
-        res_array = fft_wd.data[index_freq]
-        return res_array
+        return p.getFFT(self.data,self.sRate,freq,mode=mode,half=half,method=method,**kw)
 
     def high_resample(self,sRate,kind='nearest'): # 复数支持与timeFunc一致
         '''提高采样率重新采样'''
@@ -419,14 +510,23 @@ class Wavedata(object):
         wd = self.init(timeFunc,domain,sRate)
         return wd
 
-    def resample(self,sRate): # 复数支持与timeFunc一致
-        '''改变采样率重新采样'''
+    def resample(self,sRate,method='polyphase',**kw): # 复数支持与timeFunc一致
+        '''改变采样率重新采样
+
+        Parameters:
+            sRate: 新的采样率
+            method: 'polyphase' 有理数比例时使用多相滤波器(含抗混叠)，否则自动改用'fft';
+                    'fft' 频域重采样; 'interp' 插值重采样，与high_resample/low_resample一致
+            kw: 传给_process.resample的其他参数，如maxden, align
+        '''
         if sRate == self.sRate:
             return self
-        elif sRate > self.sRate:
-            return self.high_resample(sRate)
-        elif sRate < self.sRate:
-            return self.low_resample(sRate)
+        if method == 'interp':
+            if sRate > self.sRate:
+                return self.high_resample(sRate,**kw)
+            else:
+                return self.low_resample(sRate,**kw)
+        return self.process(p.resample,new_sRate=sRate,method=method,**kw)
 
     def normalize(self):
         '''归一化 取实部和虚部绝对值的最大值进行归一，使分布在(-1,+1)'''
@@ -437,9 +537,8 @@ class Wavedata(object):
 
     def derivative(self):
         '''求导，点数不变'''
-        y1=np.append(0,self.data[:-1])
-        y2=np.append(self.data[1:],0)
-        diff_data = (y2-y1)/2 #差分数据，间隔1个点做差分
+        y=np.pad(self.data,1) # 两端补0，保持dtype
+        diff_data = (y[2:]-y[:-2])/2 #差分数据，间隔1个点做差分
         data = diff_data*self.sRate #导数，差分值除以 dt
         wd = self.__class__(data,self.sRate)
         return wd
@@ -463,6 +562,31 @@ class Wavedata(object):
         wd = self.process(filter.process)
         return wd
 
+    def quantize(self, vmax=None, bits=16):
+        '''量化为AWG使用的int16整数序列
+
+        Parameters:
+            vmax: 满量程对应的波形值，默认取实部和虚部绝对值的最大值(不截断)
+            bits: 量化位数，不超过16，满量程对应 2**(bits-1)-1
+        Return:
+            codes: int16序列；IQ波形返回2行，分别为I/Q
+            info: 字典，包含 scale(每单位波形值对应的码值)、vmax、
+                  clipped(被截断的点数)、peak(波形实际的最大绝对值)
+        '''
+        assert 1 < bits <= 16
+        rows = np.array([np.real(self.data), np.imag(self.data)]) if self.isIQ \
+            else np.real(self.data)
+        peak = float(np.max(np.abs(rows))) if rows.size else 0.0
+        if vmax is None:
+            vmax = peak if peak > 0 else 1.0
+        code_max = 2**(bits-1)-1
+        scale = code_max/vmax
+        codes = np.rint(rows*scale)
+        clipped = int(np.count_nonzero((codes > code_max) | (codes < -code_max-1)))
+        codes = np.clip(codes, -code_max-1, code_max).astype(np.int16)
+        info = dict(scale=scale, vmax=vmax, clipped=clipped, peak=peak)
+        return codes, info
+
     def plot(self, fmt1='', fmt2='--', isfft=False, ax=None, **kw):
         '''对于FFT变换后的波形数据，包含0频成分，x从0开始；
         使用isfft=True会去除了x的偏移，画出的频谱更准确'''
@@ -495,6 +619,74 @@ class Wavedata(object):
             return res
 
 
+class WavedataBuilder(object):
+    '''Wavedata 序列构造器
+
+    收集波形片段，调用build时预分配整段内存并一次性写入，
+    避免循环中反复使用 wd|o 串联造成的平方级复制开销'''
+
+    def __init__(self, sRate=1):
+        self.sRate = sRate
+        self._segments = []
+        self._hints = []
+        self._size = 0
+
+    @property
+    def size(self):
+        '''已收集的总点数'''
+        return self._size
+
+    @property
+    def len(self):
+        '''已收集的总长度'''
+        return self._size/self.sRate
+
+    def __len__(self):
+        return self._size
+
+    def append(self, wd):
+        '''添加一个Wavedata片段，返回构造器本身，可以链式调用'''
+        assert isinstance(wd,Wavedata)
+        assert wd.sRate == self.sRate
+        self._segments.append(wd.data)
+        self._hints.append(wd._IQhint())
+        self._size += wd.size
+        return self
+
+    def extend(self, wd_list):
+        '''依次添加多个Wavedata片段'''
+        for wd in wd_list:
+            self.append(wd)
+        return self
+
+    def __or__(self, wd):
+        '''builder|wd 等同于 append'''
+        return self.append(wd)
+
+    def build(self, cls=None):
+        '''生成串联后的波形，默认返回Wavedata类实例'''
+        if cls is None:
+            cls = Wavedata
+        if self._segments:
+            dtype = np.result_type(*set([seg.dtype for seg in self._segments]))
+        else:
+            dtype = float
+        data = np.empty(self._size, dtype=dtype)
+        start = 0
+        for seg in self._segments:
+            stop = start+seg.size
+            data[start:stop] = seg
+            start = stop
+        # 串联不改变数据值，可以由各片段的IQ状态得到结果的IQ状态
+        if any(self._hints):
+            isIQ = True
+        elif None in self._hints:
+            isIQ = None
+        else:
+            isIQ = False
+        return cls(data, self.sRate, isIQ=isIQ)
+
+
 class WavedataN(object):
     """docstring for WavedataN."""
 
@@ -552,6 +744,12 @@ class WavedataN(object):
         array=self.array>>t
         return self.__class__(array)
 
+    def fractional_shift(self, t, method='fft', **kw):
+        '''对每个波形做分数点数的时移，参数参考Wavedata.fractional_shift'''
+        pyfunc=lambda wd: wd.fractional_shift(t,method,**kw)
+        array=np.frompyfunc(pyfunc,1,1)(self.array)
+        return self.__class__(array)
+
     def __lshift__(self, t):
         array=self.array<<t
         return self.__class__(array)
@@ -559,7 +757,8 @@ class WavedataN(object):
     def __or__(self, other):
         assert isinstance(other,WavedataN)
         assert self.shape == other.shape
-        array=self.array|other.array
+        concat2 = lambda a,b: a.__class__.concat([a,b])
+        array=np.frompyfunc(concat2,2,1)(self.array,other.array)
         return self.__class__(array)
 
     def __xor__(self, n):
@@ -613,6 +812,48 @@ class WavedataN(object):
         array = v / self.array
         return self.__class__(array)
 
+    def resample(self,sRate,method='polyphase',**kw):
+        '''对每个波形改变采样率重新采样，参数参考Wavedata.resample'''
+        pyfunc=lambda wd: wd.resample(sRate,method,**kw)
+        array=np.frompyfunc(pyfunc,1,1)(self.array)
+        return self.__class__(array)
+
+    def _stacked(self):
+        '''各波形点数和采样率相同时返回 (形状为shape+(点数,)的数组, 采样率)，否则返回 (None, None)'''
+        sizes, sRates = self.size, self.sRate
+        if self.array.size > 0 and np.all(sizes == sizes.flat[0]) and np.all(sRates == sRates.flat[0]):
+            data = np.array(list(self.data.flat)).reshape(self.shape+(sizes.flat[0],))
+            return data, sRates.flat[0]
+        return None, None
+
+    def getFFT(self,freq,mode='complex',half=False,method='dft',**kw):
+        '''获取每个波形指定频率的FFT分量，参数参考Wavedata.getFFT；
+        各波形点数和采样率相同时一次批量计算，返回形状为 shape+np.shape(freq) 的数组，
+        否则返回object数组'''
+        data, sRate = self._stacked()
+        if data is not None:
+            return p.getFFT(data,sRate,freq,mode=mode,half=half,method=method,**kw)
+        pyfunc=lambda wd: wd.getFFT(freq,mode,half,method,**kw)
+        return np.frompyfunc(pyfunc,1,1)(self.array)
+
+    def convolve(self,other,mode='same',norm=True,method='auto'):
+        '''每个波形与同一个卷积核卷积，参数参考Wavedata.convolve；
+        各波形点数和采样率相同时堆叠成二维数组一次计算'''
+        data, sRate = self._stacked()
+        if data is not None:
+            kernal = np.asarray(other.data if isinstance(other,Wavedata) else other)
+            if norm:
+                kernal = kernal/np.sum(kernal)
+            data,sRate = p.convolve(data,sRate,kernal,mode=mode,method=method)
+            return self.__class__.init(data,np.full(self.shape,sRate))
+        pyfunc=lambda wd: wd.convolve(other,mode,norm,method)
+        return self.__class__(np.frompyfunc(pyfunc,1,1)(self.array))
+
+    def dense(self):
+        '''转化为DenseWavedataN，各波形采样率必须相同'''
+        from ._dense import DenseWavedataN
+        return DenseWavedataN.from_wavedataN(self)
+
     def plot(self,**kw):
         array = self.array.flatten()
         row, = array.shape
@@ -14,8 +14,8 @@ with open(path.join(here, 'README.md'), encoding='utf-8') as f:
 exec(open('qulab_toolbox/_version.py').read())
 
 requirements = [
-    'numpy>=1.13.3',
-    'scipy>=1.2.0',
+    'numpy>=1.17.0',
+    'scipy>=1.4.0',
     'matplotlib>=2.1.0',
     'blinker>=1.4',
     # 'QuLab>=0.4.0',
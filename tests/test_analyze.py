@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN, DenseWavedataN, A, F
+
+
+def _readout(size=4000, sRate=1e9, freqs=(50e6, -120e6, 210e6), seed=0):
+    '''多频率读出信号，各频率的复振幅不同，加少量噪声'''
+    rng = np.random.default_rng(seed)
+    t = (np.arange(size)+0.5)/sRate
+    amps = np.array([0.3+0.1j, -0.2+0.25j, 0.05-0.4j])[:len(freqs)]
+    data = sum([a*np.exp(2j*np.pi*f*t) for a, f in zip(amps, freqs)])
+    data = data+0.01*(rng.standard_normal(size)+1j*rng.standard_normal(size))
+    return Wavedata(data, sRate), np.array(freqs), amps
+
+
+def test_channelize_matches_per_tone_homodyne():
+    wd, freqs, amps = _readout()
+    flt = F.lowpass(5e6)
+    res = A.Channelize(wd, freqs, flt=flt)
+    assert isinstance(res, DenseWavedataN) and res.shape == (3,)
+    for row, f, a in zip(res.array, freqs, amps):
+        ref = A.Homodyne(wd, f).filter(flt)
+        np.testing.assert_allclose(row.data, ref.data, atol=1e-12)
+        np.testing.assert_allclose(np.mean(row.data[1000:-1000]), a, atol=5e-3)
+    dec = A.Channelize(wd, freqs, flt=flt, decimate=8)
+    assert dec.sRate == wd.sRate/8
+    np.testing.assert_allclose(dec.data, res.data[:,3::8])
+
+
+def test_channelize_calibration():
+    wd, freqs, _ = _readout()
+    flt = F.lowpass(5e6)
+    cali = np.array([[1.2, 0.05, 0], [0.8, -0.02, 0]])
+    raw = Wavedata((wd.data.real*1.2+0.05)+1j*(wd.data.imag*0.8-0.02), wd.sRate)
+    res = A.Channelize(raw, freqs, flt=flt, cali=cali)
+    np.testing.assert_allclose(res.data, A.Channelize(wd, freqs, flt=flt).data, atol=1e-12)
+
+
+def _shots(n=20, size=1000, freqs=(50e6, -120e6), seed=1):
+    rng = np.random.default_rng(seed)
+    t = (np.arange(size)+0.5)/1e9
+    amps = rng.standard_normal((n, len(freqs)))+1j*rng.standard_normal((n, len(freqs)))
+    data = np.einsum('sk,kt->st', amps, np.exp(2j*np.pi*np.outer(freqs, t)))
+    return data, np.array(freqs), amps, t
+
+
+def test_IQExtract_matches_homodyne_mean():
+    data, freqs, amps, t = _shots()
+    res = A.IQExtract(data, freqs, 1e9)
+    assert res.shape == (20, 2)
+    ref = [[A.Homodyne(Wavedata(d, 1e9), f).data.mean() for f in freqs] for d in data]
+    np.testing.assert_allclose(res, ref, atol=1e-12)
+    np.testing.assert_allclose(res, amps, atol=0.02)
+    wdN = WavedataN([Wavedata(d, 1e9) for d in data])
+    np.testing.assert_allclose(A.IQExtract(wdN, freqs), res, atol=1e-12)
+    np.testing.assert_allclose(A.IQExtract(wdN.dense(), freqs), res, atol=1e-12)
+    np.testing.assert_allclose(A.IQExtract(Wavedata(data[3], 1e9), freqs), res[3], atol=1e-12)
+    real = A.IQExtract(data.real.astype(np.float32), freqs, 1e9)
+    np.testing.assert_allclose(real, A.IQExtract(data.real, freqs, 1e9), rtol=1e-4, atol=1e-5)
+
+
+def test_DemodMatrix_weights_and_window():
+    data, freqs, _, t = _shots()
+    window = (100e-9, 600e-9)
+    sel = (t >= window[0]) & (t < window[1])
+    res = A.IQExtract(data, freqs, 1e9, window=window)
+    ref = [[A.Homodyne(Wavedata(d, 1e9), f).data[sel].mean() for f in freqs] for d in data]
+    np.testing.assert_allclose(res, ref, atol=1e-12)
+    w = np.linspace(0, 1, t.size)
+    matrix = A.DemodMatrix(freqs, t.size, 1e9, weights=w)
+    ref = [[np.sum(w*A.Homodyne(Wavedata(d, 1e9), f).data)/w.sum() for f in freqs] for d in data]
+    np.testing.assert_allclose(A.IQExtract(data, matrix=matrix), ref, atol=1e-12)
+    cached = A.DemodMatrix(freqs, t.size, 1e9)
+    assert cached is A.DemodMatrix(freqs, t.size, 1e9) and not cached.flags.writeable
+
+
+def test_IQExtract_rejects_ragged_shots():
+    wdN = WavedataN([Wavedata(np.ones(100), 1e9), Wavedata(np.ones(90), 1e9)])
+    with pytest.raises(AssertionError):
+        A.IQExtract(wdN, [50e6])
+
+
+def _pulses(size, spans):
+    data = np.zeros(size)
+    for a, b in spans:
+        data[a:b] = np.hanning(b-a+2)[1:-1]
+    return data
+
+
+def _mask_reference(data, extend):
+    '''按原来的方法用方窗卷积计算的掩模'''
+    mask = (np.asarray(data) != 0).astype(int)
+    if extend == 0:
+        return mask
+    e = abs(extend)
+    count = np.convolve(mask, np.ones(2*e+1), mode='same')
+    return (count > 0.5).astype(int) if extend > 0 else (count > 2*e+0.5).astype(int)
+
+
+def _intervals_reference(mask):
+    res, start = [], None
+    for i, m in enumerate(list(mask)+[0]):
+        if m and start is None:
+            start = i
+        elif not m and start is not None:
+            res.append((start, i))
+            start = None
+    return res
+
+
+@pytest.mark.parametrize('extend', [0, 1, 3, 40, -1, -3, -40])
+def test_dataMask_matches_convolution(extend):
+    data = _pulses(1000, [(0, 5), (50, 60), (64, 150), (400, 401), (950, 1000)])
+    mask, iv = A.dataMask(data, extend, intervals=True)
+    ref = _mask_reference(data, extend)
+    np.testing.assert_array_equal(mask, ref)
+    assert iv == _intervals_reference(ref)
+    batch, ivs = A.dataMask(np.stack([data, data[::-1]]), extend, intervals=True)
+    np.testing.assert_array_equal(batch, [ref, _mask_reference(data[::-1], extend)])
+    assert ivs == [iv, _intervals_reference(batch[1])]
+
+
+@pytest.mark.parametrize('extend', [2, -2])
+def test_wdMask_batches_match_single(extend):
+    wds = [Wavedata(_pulses(300, [(10, 40), (200, 210)]), 1e9),
+           Wavedata(_pulses(250, [(0, 30), (240, 250)]), 1e9)]
+    res, ivs = A.wdMask(WavedataN(wds), extend_point=extend, intervals=True)
+    for row, iv, wd in zip(res.array, ivs, wds):
+        ref, ref_iv = A.wdMask(wd, extend_point=extend, intervals=True)
+        np.testing.assert_array_equal(row.data, ref.data)
+        np.testing.assert_array_equal(ref.data, _mask_reference(wd.data, extend))
+        assert iv == ref_iv == [(a/1e9, b/1e9) for a, b in _intervals_reference(ref.data)]
+    assert A.dataMask(np.zeros(0), 3, intervals=True)[1] == []
@@ -0,0 +1,83 @@
+import numpy as np
+from scipy.stats import multivariate_normal
+
+from qulab_toolbox.wavedata import C
+
+
+def _clouds(n=2000, centers=((0.2+0.1j, -0.3+0.4j), (0.6-0.2j, 0.1+0.1j)), sigma=(0.12, 0.2), seed=0):
+    '''各态的 (发数, 频率数) IQ，噪声在I/Q方向的大小不同'''
+    rng = np.random.default_rng(seed)
+    res = []
+    for c in centers:
+        c = np.asarray(c)
+        noise = sigma[0]*rng.standard_normal((n, c.size))+1j*sigma[1]*rng.standard_normal((n, c.size))
+        res.append(c+noise)
+    return res
+
+
+def _nearest(data, centers):
+    '''逐点求最近中心的参考实现'''
+    states = np.empty(data.shape, dtype=int)
+    for s in range(data.shape[0]):
+        for q in range(data.shape[1]):
+            states[s, q] = np.argmin([abs(data[s, q]-c[q]) for c in centers])
+    return states
+
+
+def test_linear_classifier_matches_nearest_center():
+    clouds = _clouds()
+    clf = C.LinearClassifier().fit(*clouds)
+    data = np.concatenate(clouds)
+    np.testing.assert_array_equal(clf.predict(data), _nearest(data, clf.centers))
+    qutrit = _clouds(centers=((0j,), (1+0j,), (0.5+0.8j,)))
+    clf3 = C.LinearClassifier().fit(*qutrit)
+    data = np.concatenate(qutrit)
+    np.testing.assert_array_equal(clf3.predict(data), _nearest(data, clf3.centers))
+
+
+def test_gmm_matches_scipy_density():
+    clouds = _clouds()
+    clf = C.GMMClassifier().fit(*clouds)
+    data = np.concatenate(clouds)
+    proba = clf.proba(data)
+    for q in range(data.shape[1]):
+        xy = np.stack([data[:, q].real, data[:, q].imag], axis=-1)
+        pdf = np.array([multivariate_normal(clf.means[k, q], clf.covs[k, q]).pdf(xy) for k in range(2)]).T
+        np.testing.assert_allclose(proba[:, q], pdf/pdf.sum(axis=-1, keepdims=True), atol=1e-9)
+        np.testing.assert_array_equal(clf.predict(data)[:, q], np.argmax(pdf, axis=-1))
+        for k in range(2):
+            c = np.stack([clouds[k][:, q].real, clouds[k][:, q].imag])
+            np.testing.assert_allclose(clf.means[k, q], c.mean(axis=-1))
+            np.testing.assert_allclose(clf.covs[k, q], np.cov(c, bias=True), rtol=1e-6)
+
+
+def test_gmm_fit_mixture_recovers_components():
+    clouds = _clouds(n=3000)
+    ref = C.GMMClassifier().fit(*clouds)
+    mixture = np.concatenate([clouds[0][:2000], clouds[1][:1000]])
+    clf = C.GMMClassifier().fit(*clouds).fit_mixture(mixture)
+    np.testing.assert_allclose(clf.weights, [[2/3, 2/3], [1/3, 1/3]], atol=0.03)
+    np.testing.assert_allclose(clf.means, ref.means, atol=0.03)
+    blind = C.GMMClassifier(2).fit_mixture(mixture)
+    assert np.mean(blind.predict(mixture) == clf.predict(mixture)) > 0.97 or \
+        np.mean(blind.predict(mixture) != clf.predict(mixture)) > 0.97
+
+
+def test_assignment_and_joint_statistics():
+    rng = np.random.default_rng(1)
+    states_list = [rng.integers(0, 3, (500, 4)) for _ in range(3)]
+    M = C.assignment_matrix(states_list, 3)
+    assert M.shape == (4, 3, 3)
+    for q in range(4):
+        for i, states in enumerate(states_list):
+            for j in range(3):
+                assert M[q, i, j] == np.mean(states[:, q] == j)
+    states = states_list[0]
+    codes = C.joint_outcomes(states, 3)
+    np.testing.assert_array_equal(codes, [sum(int(s[q])*3**q for q in range(4)) for s in states])
+    np.testing.assert_allclose(C.joint_histogram(states, 3), np.bincount(codes, minlength=81)/500)
+    bits = rng.integers(0, 2, (100, 5))
+    np.testing.assert_array_equal(C.joint_outcomes(bits), bits @ (2**np.arange(5)))
+    clouds = _clouds()
+    clf = C.LinearClassifier().fit(*clouds)
+    np.testing.assert_allclose(clf.assignment(*clouds), C.assignment_matrix([clf.predict(c) for c in clouds]))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN, DenseWavedataN, F
+
+
+def _ragged(sizes=(300, 120, 257), sRate=1e9, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [Wavedata(rng.standard_normal(n)+0.5, sRate) for n in sizes]
+    return WavedataN(rows), rows
+
+
+def _assert_rows(res, ref_rows):
+    res = res.array if isinstance(res, WavedataN) else res
+    assert len(res) == len(ref_rows)
+    for wd, ref in zip(res, ref_rows):
+        assert wd.sRate == ref.sRate
+        assert wd.size == ref.size
+        np.testing.assert_allclose(wd.data, ref.data, atol=1e-12)
+
+
+@pytest.mark.parametrize('flt', [
+    F.DCBlock,
+    F.lowpass(50e6),
+    F.GaussFilter(5),
+    F.series(F.GaussFilter(3), F.DCBlock),
+])
+def test_dense_ragged_filter(flt):
+    wdN, rows = _ragged()
+    dense = wdN.dense()
+    assert not dense.isUniform
+    _assert_rows(flt.filt(dense), [wd.filter(flt) for wd in rows])
+    _assert_rows(dense.filter(flt), [wd.filter(flt) for wd in rows])
+
+
+@pytest.mark.parametrize('mode', ['same', 'full', 'valid'])
+@pytest.mark.parametrize('ksize', [9, 200])
+def test_dense_ragged_convolve(mode, ksize):
+    wdN, rows = _ragged()
+    kernal = np.hanning(ksize)
+    _assert_rows(wdN.dense().convolve(kernal, mode), [wd.convolve(kernal, mode) for wd in rows])
+
+
+@pytest.mark.parametrize('method', ['fft', 'sinc', 'farrow'])
+def test_dense_ragged_fractional_shift(method):
+    wdN, rows = _ragged()
+    t = 3.3e-9
+    _assert_rows(wdN.dense().fractional_shift(t, method),
+                 [wd.fractional_shift(t, method) for wd in rows])
+
+
+def test_dense_ragged_FFT_and_arithmetic():
+    wdN, rows = _ragged()
+    dense = wdN.dense()
+    _assert_rows(dense.FFT(), [wd.FFT() for wd in rows])
+    _assert_rows(2*dense+1, [2*wd+1 for wd in rows])
+    _assert_rows(dense.to_wavedataN(), rows)
+
+
+def test_dense_rows_are_readonly():
+    dense = DenseWavedataN(np.zeros((2, 4)), 1)
+    with pytest.raises(ValueError):
+        dense[0].data[0] = 1
+    with pytest.raises(ValueError):
+        dense.array[1].data[0] = 1
+
+
+@pytest.mark.parametrize('n', [0, 1, 3])
+def test_dense_ragged_repeat_and_concat(n):
+    wdN, rows = _ragged((5, 2, 4), 1)
+    dense = wdN.dense()
+    _assert_rows(dense^n, [wd^n for wd in rows])
+    _assert_rows(dense|dense, [wd|wd for wd in rows])
+
+
+def test_dense_ragged_shift():
+    wdN, rows = _ragged((5, 2, 4), 1)
+    dense = wdN.dense()
+    _assert_rows(dense >> 1, [wd >> 1 for wd in rows])
+    _assert_rows(dense << 2, [wd << 2 for wd in rows])
+    with pytest.raises(TypeError):
+        dense >> 3
+    with pytest.raises(TypeError):
+        rows[1] >> 3
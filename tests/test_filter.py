@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+import scipy.signal as signal
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN, F
+
+
+def _chunks(x, sizes):
+    edges = np.cumsum(sizes)
+    return np.split(x, edges[edges < x.shape[-1]], axis=-1)
+
+
+def _stream(flt, x, sizes=(1, 0, 37, 100, 5, 400)):
+    s = flt.stream()
+    out = [s.push(c) for c in _chunks(x, sizes)]
+    out.append(s.flush())
+    return np.concatenate(out, axis=-1)
+
+
+@pytest.mark.parametrize('flt', [F.GaussFilter(4), F.FIRFilter(np.ones(6)/6), F.Filter()])
+def test_stream_fir_matches_process(flt):
+    x = np.random.default_rng(1).standard_normal((3, 700))
+    ref, _ = flt.process(x, 1e9)
+    np.testing.assert_allclose(_stream(flt, x), ref, atol=1e-12)
+
+
+@pytest.mark.parametrize('sos', [True, False])
+def test_stream_iir_is_causal_filter(sos):
+    flt = F.lowpass(50e6, sos=sos)
+    x = np.random.default_rng(2).standard_normal(700)+1j
+    ref = signal.sosfilt(flt.sos, x) if sos else signal.lfilter(*flt.ba, x)
+    np.testing.assert_allclose(_stream(flt, x), ref, atol=1e-10)
+
+
+def test_stream_series():
+    flt = F.series(F.GaussFilter(3), F.lowpass(50e6), fuse=False)
+    x = np.random.default_rng(3).standard_normal(600)
+    y, _ = F.GaussFilter(3).process(x, 1e9)
+    ref = signal.sosfilt(flt.filters[1].sos, y)
+    np.testing.assert_allclose(_stream(flt, x), ref, atol=1e-10)
+
+
+@pytest.mark.parametrize('flt', [F.WGN(10), F.DCBlock, F.series(F.GaussFilter(3), F.DCBlock)])
+def test_stream_not_supported(flt):
+    with pytest.raises(NotImplementedError):
+        flt.stream()
+
+
+def _per_element(flt, wdN):
+    return [flt.filt(wd) for wd in wdN.array.flat]
+
+
+@pytest.mark.parametrize('sizes', [(200,)*6, (200, 150, 200, 90, 200, 200)])
+@pytest.mark.parametrize('flt', [F.lowpass(50e6), F.GaussFilter(4), F.DCBlock])
+def test_filt_wavedataN_matches_per_element(sizes, flt):
+    rng = np.random.default_rng(4)
+    array = np.empty(6, dtype=object)
+    array[:] = [Wavedata(rng.standard_normal(n), 1e9) for n in sizes]
+    wdN = WavedataN(array.reshape(2, 3))
+    res = flt.filt(wdN)
+    assert isinstance(res, WavedataN) and res.shape == (2, 3)
+    for wd, ref in zip(res.array.flat, _per_element(flt, wdN)):
+        np.testing.assert_allclose(wd.data, ref.data, atol=1e-12)
+
+
+@pytest.mark.parametrize('flt', [F.lowpass(50e6), F.GaussFilter(4), F.DCBlock])
+def test_process_axis(flt):
+    x = np.random.default_rng(5).standard_normal((4, 300))
+    ref, _ = flt.process(x, 1e9)
+    res, _ = flt.process(x.T, 1e9, axis=0)
+    np.testing.assert_allclose(res.T, ref, atol=1e-12)
+
+
+def test_sos_filter_matches_scipy_design():
+    flt = F.IIRFilter(6, [40e6, 60e6], 0.01, 100, 'band', ftype='ellip', fs=1e9)
+    sos = signal.iirfilter(6, [40e6, 60e6], 0.01, 100, 'band', ftype='ellip', fs=1e9, output='sos')
+    np.testing.assert_allclose(flt.sos, sos)
+    x = np.random.default_rng(6).standard_normal((2, 2000))
+    res, sRate = flt.process(x, 1e9)
+    assert sRate == 1e9
+    np.testing.assert_allclose(res, signal.sosfiltfilt(sos, x), atol=1e-12)
+    w, h = flt.freqz()
+    _, h_ref = F._freqz_sos(sos, worN=w, fs=1e9)
+    np.testing.assert_allclose(h, h_ref, atol=1e-12)
+    passband = (w > 42e6) & (w < 58e6)
+    np.testing.assert_allclose(np.abs(h[passband]), 1, atol=2e-3)
+
+
+def test_ba_filter_matches_sos():
+    x = np.random.default_rng(7).standard_normal(1000)
+    sos_flt, ba_flt = F.lowpass(50e6), F.lowpass(50e6, sos=False)
+    assert ba_flt.sos is None
+    np.testing.assert_allclose(ba_flt.ba[0], sos_flt.ba[0])
+    np.testing.assert_allclose(ba_flt.process(x, 1e9)[0], sos_flt.process(x, 1e9)[0], atol=1e-9)
+    bessel = F.BesselFilter(4, 100e6)
+    np.testing.assert_allclose(bessel.sos, signal.bessel(4, 100e6, norm='phase', fs=1e9, output='sos'))
+
+
+def _interior(x, n=500):
+    return x[...,n:-n]
+
+
+@pytest.mark.parametrize('stages', [
+    [F.GaussFilter(3), F.Filter(), F.GaussFilter(5)],
+    [F.lowpass(100e6), F.lowpass(200e6)],
+    [F.GaussFilter(3), F.DCBlock, F.DCBlock, F.lowpass(100e6)],
+])
+def test_series_fusion_matches_stagewise(stages):
+    x = np.random.default_rng(8).standard_normal((2, 3000))
+    ref = x
+    for f in stages:
+        ref, _ = f.process(ref, 1e9)
+    plain = F.series(*stages, fuse=False)
+    assert plain.filters == stages
+    np.testing.assert_allclose(plain.process(x, 1e9)[0], ref)
+    fused = F.series(*stages)
+    # 合并后只在两端滤波器暂态的长度内与逐级处理不同
+    np.testing.assert_allclose(_interior(fused.process(x, 1e9)[0]), _interior(ref), atol=1e-9)
+
+
+def test_series_fusion_stages():
+    assert isinstance(F.series(F.GaussFilter(3), F.GaussFilter(5)), F.FIRFilter)
+    fused = F.series(F.lowpass(100e6), F.lowpass(200e6))
+    assert fused.sos.shape[0] == F.lowpass(100e6).sos.shape[0]*2
+    assert len(F.series(F.GaussFilter(3), F.DCBlock, F.DCBlock, F.lowpass(100e6)).filters) == 3
+
+
+def test_parallel_fir_matches_average():
+    x = np.random.default_rng(9).standard_normal(500)
+    stages = [F.GaussFilter(3), F.GaussFilter(6), F.FIRFilter(np.ones(5)/5)]
+    fused = F.parallel(*stages)
+    assert isinstance(fused, F.FIRFilter)
+    ref = np.mean([f.process(x, 1e9)[0] for f in stages], axis=0)
+    np.testing.assert_allclose(fused.process(x, 1e9)[0], ref, atol=1e-12)
+    mixed = F.parallel(F.GaussFilter(3), F.lowpass(100e6))
+    ref = np.mean([f.process(x, 1e9)[0] for f in mixed.filters], axis=0)
+    np.testing.assert_allclose(mixed.process(x, 1e9)[0], ref)
+
+
+def test_design_cache_returns_equal_independent_copies():
+    F.clear_design_cache()
+    f1 = F.IIRFilter(4, [40e6, 60e6], fs=1e9)
+    info = F.design_cache_info()
+    f2 = F.IIRFilter(4, [40e6, 60e6], fs=1e9)
+    assert F.design_cache_info()['hits'] == info['hits']+1
+    np.testing.assert_array_equal(f1.sos, signal.iirfilter(4, [40e6, 60e6], 0.01, 100, 'band',
+                                                            ftype='ellip', fs=1e9, output='sos'))
+    np.testing.assert_array_equal(f1.sos, f2.sos)
+    f1.sos[0, 0] = 0 # 修改实例的系数不影响缓存
+    np.testing.assert_array_equal(F.IIRFilter(4, [40e6, 60e6], fs=1e9).sos, f2.sos)
+    assert F.IIRFilter(4, [40e6, 61e6], fs=1e9).sos[0, 0] != f2.sos[0, 0]
+    np.testing.assert_array_equal(F.GaussKernal(5, 2), F._GaussKernal(5, 2))
+    assert F.GaussKernal(5, 2) is not F.GaussKernal(5, 2)
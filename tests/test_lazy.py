@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, LazyWavedata
+from qulab_toolbox.wavedata._wd_func import Blank, Gaussian, Sin
+
+
+def test_lazy_matches_eager():
+    a = Sin(2*np.pi*50e6, 0, 1e-6, 1e9)
+    b = Gaussian(3e-7, 1e9)
+    c = Blank(2e-6, 1e9)+0.1
+    ref = (2*a+b)*c-a/3+(-b)**2
+    lazy = (2*a.lazy()+b)*c.lazy()-a/3+(-b.lazy())**2
+    assert isinstance(lazy, LazyWavedata) and lazy.isLazy
+    assert lazy.size == ref.size
+    np.testing.assert_allclose(lazy.data, ref.data, atol=1e-12)
+    assert not lazy.isLazy
+    assert type(lazy.compute()) is Wavedata
+
+
+def test_lazy_blockwise_evaluation():
+    a = Sin(2*np.pi*3e6, 0, 1e-5, 1e9)
+    lazy = a.lazy()*a+1
+    lazy.blocksize = 777
+    np.testing.assert_allclose(lazy.data, (a*a+1).data)
+
+
+@pytest.mark.parametrize('n', [600, 3000])
+def test_lazy_deep_accumulation(n):
+    g = Gaussian(1e-7, 1e9)
+    acc, ref = Blank(1e-6, 1e9).lazy(), Blank(1e-6, 1e9)
+    for i in range(n):
+        if i % 2:
+            acc, ref = acc*0.999+g, ref*0.999+g
+        else:
+            acc, ref = 0.5*g+acc, 0.5*g+ref
+    assert acc.size == ref.size and acc.len == ref.len
+    np.testing.assert_allclose(acc.data, ref.data, atol=1e-9)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import MatchedFilter, A
+
+
+def _states(n=400, size=800, freqs=(50e6, -120e6), sRate=1e9, seed=0):
+    '''两态单发读出：激发态在前半段和基态不同，之后衰减到基态，加白噪声'''
+    rng = np.random.default_rng(seed)
+    t = (np.arange(size)+0.5)/sRate
+    env_g = np.array([0.2+0.1j, -0.1+0.2j])
+    env_e = np.array([-0.1+0.2j, 0.2+0.1j])
+    decay = np.exp(-t/150e-9)
+    carrier = np.exp(2j*np.pi*np.outer(freqs, t))
+    g = np.einsum('k,kt->t', env_g, carrier)
+    e = np.einsum('kt,kt->t', env_g[:,None]+(env_e-env_g)[:,None]*decay, carrier)
+    noise = lambda: 0.5*(rng.standard_normal((n, size))+1j*rng.standard_normal((n, size)))
+    return g+noise(), e+noise(), np.array(freqs), sRate
+
+
+def _separation(ground, excited):
+    '''两态IQ中心距离与标准差之比'''
+    d = np.abs(excited.mean(axis=0)-ground.mean(axis=0))
+    s = np.sqrt((np.var(excited, axis=0)+np.var(ground, axis=0))/2)
+    return d/s
+
+
+@pytest.mark.parametrize('method', ['diff', 'lda'])
+def test_matched_filter_beats_boxcar(method):
+    g, e, freqs, sRate = _states()
+    mf = MatchedFilter(freqs, sRate, method=method).fit(g, e)
+    np.testing.assert_allclose(mf(g), A.IQExtract(g, sRate=sRate, matrix=mf.matrix))
+    iq_g, iq_e = mf(g), mf(e)
+    assert iq_g.shape == (400, 2)
+    assert np.all(_separation(iq_g, iq_e) > 1.3*_separation(A.IQExtract(g, freqs, sRate), A.IQExtract(e, freqs, sRate)))
+    # 两态沿实轴分开
+    diff = iq_e.mean(axis=0)-iq_g.mean(axis=0)
+    assert np.all(diff.real > 0) and np.all(np.abs(diff.imag) < 0.1*diff.real)
+
+
+def test_matched_filter_save_load(tmp_path):
+    g, e, freqs, sRate = _states(n=50)
+    mf = MatchedFilter(freqs, sRate, method='lda', window=(0, 500e-9)).fit(g, e)
+    mf.save(tmp_path/'mf.npz')
+    loaded = MatchedFilter.load(tmp_path/'mf.npz')
+    assert loaded.method == 'lda' and loaded.window == (0, 500e-9)
+    np.testing.assert_allclose(loaded(e), mf(e))
+    with pytest.raises(AssertionError):
+        MatchedFilter(freqs, sRate).apply(g)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from qulab_toolbox.wavedata import NCO, carrier
+
+
+def test_nco_blocks_are_phase_continuous():
+    freq, sRate, phase = [12.3456789e6, -47.1e6], 1e9, [0.3, -1.2]
+    whole = NCO(freq, sRate, phase).generate(10000)
+    nco = NCO(freq, sRate, phase)
+    parts = np.concatenate([nco.generate(n) for n in (1, 999, 4000, 0, 5000)], axis=-1)
+    np.testing.assert_array_equal(parts, whole)
+    blocks = np.concatenate(list(NCO(freq, sRate, phase).blocks(10000, 777)), axis=-1)
+    np.testing.assert_array_equal(blocks, whole)
+
+
+def test_nco_matches_time_grid():
+    freq, sRate, size = 12.3456789e6, 1e9, 5000
+    t = (np.arange(size)+0.5)/sRate
+    np.testing.assert_allclose(carrier(freq, size, sRate, 0.5), np.exp(1j*(2*np.pi*freq*t+0.5)), atol=1e-9)
+    np.testing.assert_allclose(carrier(freq, size, sRate, kind='cos'), np.cos(2*np.pi*freq*t), atol=1e-9)
+
+
+def test_nco_long_run_phase():
+    # 长时间运行后相位仍与精确值一致，不随点数累积误差
+    freq, sRate = 1e6/3, 1e9
+    nco = NCO(freq, sRate)
+    nco.generate(3*10**6)
+    ph = np.angle(nco.generate(1)[0])
+    exact = np.angle(np.exp(2j*np.pi*(freq*((3*10**6+0.5)/sRate) % 1)))
+    assert abs(ph-exact) < 1e-9
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN
+from qulab_toolbox.wavedata import _process as p
+
+
+def _pulse(t):
+    '''带限的高斯包络脉冲，可以在任意时间求值'''
+    return np.exp(-((t-200e-9)/30e-9)**2)*np.cos(2*np.pi*20e6*t)
+
+
+@pytest.mark.parametrize('method, atol', [('fft', 1e-12), ('sinc', 1e-3), ('farrow', 1e-4)])
+@pytest.mark.parametrize('d', [0.3e-9, 7.6e-9, -12.25e-9, 5e-9])
+def test_fractional_shift_matches_delayed_signal(method, atol, d):
+    sRate = 1e9
+    t = (np.arange(400)+0.5)/sRate
+    wd = Wavedata(_pulse(t), sRate)
+    res = wd.fractional_shift(d, method)
+    assert res.size == wd.size
+    np.testing.assert_allclose(res.data, _pulse(t-d), atol=atol)
+    iq = Wavedata(_pulse(t)*(1+0.5j), sRate).fractional_shift(d, method)
+    np.testing.assert_allclose(iq.data, _pulse(t-d)*(1+0.5j), atol=atol)
+
+
+@pytest.mark.parametrize('method', ['fft', 'sinc', 'farrow'])
+def test_fractional_shift_integer_equals_shift(method):
+    wd = Wavedata(_pulse((np.arange(400)+0.5)/1e9), 1e9)
+    np.testing.assert_allclose(wd.fractional_shift(5e-9, method).data, (wd >> 5e-9).data, atol=1e-12)
+    wdN = WavedataN([wd, wd << 3e-9])
+    for res, ref in zip(wdN.fractional_shift(2.5e-9, method).array, wdN.array):
+        np.testing.assert_allclose(res.data, ref.fractional_shift(2.5e-9, method).data)
+
+
+@pytest.mark.parametrize('method, atol', [('polyphase', 2e-3), ('fft', 1e-12)])
+@pytest.mark.parametrize('new_sRate', [2.5e9, 0.8e9, 1.2e9, 1.7e9])
+def test_resample_matches_signal_on_new_grid(method, atol, new_sRate):
+    sRate = 1e9
+    wd = Wavedata(_pulse((np.arange(400)+0.5)/sRate), sRate)
+    res = wd.resample(new_sRate, method)
+    assert res.sRate == new_sRate and res.size == round(400*new_sRate/sRate)
+    np.testing.assert_allclose(res.data, _pulse((np.arange(res.size)+0.5)/new_sRate), atol=atol)
+    data, _ = p.resample(np.stack([wd.data, 2*wd.data]), sRate, new_sRate, method)
+    np.testing.assert_allclose(data, [res.data, 2*res.data], atol=1e-12)
+
+
+def test_resample_interp_matches_legacy():
+    wd = Wavedata(_pulse((np.arange(400)+0.5)/1e9), 1e9)
+    np.testing.assert_array_equal(wd.resample(2.5e9, 'interp').data, wd.high_resample(2.5e9).data)
+    np.testing.assert_allclose(wd.resample(0.8e9, 'interp').data, wd.low_resample(0.8e9).data)
+
+
+def _fft_reference(data, half):
+    '''按原来的定义用np.fft计算的频谱'''
+    size = data.shape[-1]
+    res = np.fft.fft(data)/size
+    if half:
+        res = res[...,:int((size+1)/2)-1]
+        res[...,1:] *= 2
+    return res
+
+
+@pytest.mark.parametrize('size', [400, 401])
+@pytest.mark.parametrize('half', [True, False])
+@pytest.mark.parametrize('iq', [False, True])
+def test_FFT_matches_numpy(size, half, iq):
+    data = np.random.default_rng(6).standard_normal((3, size))
+    if iq:
+        data = data+1j*data[::-1]
+    ref = _fft_reference(data, half)
+    for mode, func in [('complex', lambda x: x), ('amp', np.abs), ('real', np.real), ('imag', np.imag)]:
+        res, sRate = p.FFT(data, 1e9, mode=mode, half=half, workers=2)
+        assert sRate == size/1e9
+        np.testing.assert_allclose(res, func(ref), atol=1e-12)
+    wd = Wavedata(data[0], 1e9).FFT(mode='complex', half=half)
+    np.testing.assert_allclose(wd.data, ref[0], atol=1e-12)
+
+
+def test_FFT_fast_length():
+    data = np.random.default_rng(7).standard_normal(1009)
+    res, sRate = p.FFT(data, 1e9, mode='complex', half=False, fast=True)
+    n = res.shape[-1]
+    assert n >= 1009 and sRate == n/1e9
+    np.testing.assert_allclose(res, np.fft.fft(data, n)/1009, atol=1e-12)
+
+
+@pytest.mark.parametrize('method', ['dft', 'goertzel', 'fft'])
+@pytest.mark.parametrize('half', [True, False])
+def test_getFFT_matches_full_FFT_on_grid(method, half):
+    data = np.random.default_rng(8).standard_normal((2, 3, 500))
+    full, fft_sRate = p.FFT(data, 1e9, mode='complex', half=half)
+    index = np.array([[0, 7], [31, 120]])
+    res = p.getFFT(data, 1e9, index/fft_sRate, mode='complex', half=half, method=method)
+    assert res.shape == (2, 3, 2, 2)
+    np.testing.assert_allclose(res, full[...,index], atol=1e-10)
+    amp = p.getFFT(data, 1e9, index/fft_sRate, mode='amp', half=half, method=method)
+    np.testing.assert_allclose(amp, np.abs(full[...,index]), atol=1e-10)
+
+
+@pytest.mark.parametrize('size', [1000, 300001])
+def test_getFFT_off_grid_matches_dft(size, monkeypatch):
+    rng = np.random.default_rng(9)
+    data = rng.standard_normal(size)+1j*rng.standard_normal(size)
+    freq = np.array([12.345e6, -47.1e6, 0.0])
+    k = np.arange(size)
+    ref = np.array([np.sum(data*np.exp(-2j*np.pi*f/1e9*k)) for f in freq])/size
+    np.testing.assert_allclose(p.getFFT(data, 1e9, freq), ref, atol=1e-12)
+    np.testing.assert_allclose(p.getFFT(data, 1e9, freq, method='goertzel'), ref, atol=1e-9)
+    monkeypatch.setattr(p, '_dft_block', 64) # 强制分块计算
+    np.testing.assert_allclose(p.getFFT(data, 1e9, freq), ref, atol=1e-12)
+
+
+def test_getFFT_wavedataN_batches():
+    rng = np.random.default_rng(10)
+    wdN = WavedataN([Wavedata(rng.standard_normal(300), 1e9) for _ in range(4)])
+    res = wdN.getFFT([10e6, 20e6])
+    assert res.shape == (4, 2)
+    for row, wd in zip(res, wdN.array):
+        np.testing.assert_allclose(row, wd.getFFT([10e6, 20e6]))
+
+
+@pytest.mark.parametrize('method', ['direct', 'fft', 'oa', 'auto'])
+@pytest.mark.parametrize('mode', ['full', 'same', 'valid'])
+@pytest.mark.parametrize('n, K', [(1, 1), (7, 2), (40, 5), (40, 8), (7, 41), (3, 100), (5000, 65)])
+def test_convolve_matches_numpy(method, mode, n, K):
+    rng = np.random.default_rng(n*K)
+    x = rng.standard_normal(n)+1j*rng.standard_normal(n)
+    k = rng.standard_normal(K)
+    ref = np.convolve(x, k, mode)
+    res, _ = p.convolve(x, 1, k, mode, method)
+    assert res.shape == ref.shape
+    np.testing.assert_allclose(res, ref, atol=1e-10)
+    res, _ = p.convolve(np.stack([x.real, x.imag]), 1, k, mode, method)
+    np.testing.assert_allclose(res, [np.convolve(x.real, k, mode), np.convolve(x.imag, k, mode)], atol=1e-10)
+
+
+@pytest.mark.parametrize('mode', ['full', 'same', 'valid'])
+def test_wavedata_convolve_matches_numpy(mode):
+    rng = np.random.default_rng(11)
+    kernal = np.hanning(33)
+    wds = [Wavedata(rng.standard_normal(300), 1e9) for _ in range(3)]
+    for wd in wds:
+        np.testing.assert_allclose(wd.convolve(kernal, mode).data,
+                                   np.convolve(wd.data, kernal/kernal.sum(), mode), atol=1e-12)
+    for res, wd in zip(WavedataN(wds).convolve(kernal, mode).array, wds):
+        np.testing.assert_allclose(res.data, wd.convolve(kernal, mode).data, atol=1e-12)
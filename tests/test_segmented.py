@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, SegmentedWavedata
+
+
+def _sparse(size, spans, seed):
+    rng = np.random.default_rng(seed)
+    data = np.zeros(size)
+    for start, stop in spans:
+        data[start:stop] = rng.standard_normal(stop-start)
+    return data
+
+
+@pytest.fixture
+def pair():
+    a = _sparse(1000, [(10, 60), (300, 320), (900, 1000)], 0)
+    b = _sparse(1200, [(40, 80), (500, 510), (950, 1100)], 1)
+    return a, b
+
+
+def test_segmented_keeps_only_nonzero(pair):
+    a, _ = pair
+    wd = SegmentedWavedata(a, 1e3)
+    assert wd.size == a.size and wd.nnz == 170
+    np.testing.assert_array_equal(wd.data, a)
+    assert type(wd.densify()) is Wavedata
+
+
+def test_segmented_arithmetic_matches_dense(pair):
+    a, b = pair
+    sa, sb = SegmentedWavedata(a, 1e3), SegmentedWavedata(b, 1e3)
+    da, db = Wavedata(a, 1e3), Wavedata(b, 1e3)
+    for res, ref in [(sa+sb, da+db), (sa-sb, da-db), (sa*sb, da*db), (sa*db, da*db),
+                     (2*sa, 2*da), (sa/4, da/4), (-sa, -da), (abs(sa), abs(da)), (sa+1, da+1)]:
+        assert res.size == ref.size
+        np.testing.assert_allclose(res.data, ref.data)
+    assert isinstance(sa+sb, SegmentedWavedata) and isinstance(sa*db, SegmentedWavedata)
+
+
+def test_segmented_layout_matches_dense(pair):
+    a, b = pair
+    sa, sb = SegmentedWavedata(a, 1e3), SegmentedWavedata(b, 1e3)
+    da, db = Wavedata(a, 1e3), Wavedata(b, 1e3)
+    for res, ref in [(sa | sb, da | db), (sa ^ 3, da ^ 3), (sa >> 0.05, da >> 0.05),
+                     (sa << 0.02, da << 0.02), (sa.append(7, 9), da.append(7, 9)),
+                     (sa.setRange(30, 950), da.setRange(30, 950))]:
+        assert res.size == ref.size
+        np.testing.assert_array_equal(res.data, ref.data)
+    assert (sa ^ 3).nnz == 3*sa.nnz
+
+
+def test_segmented_blank():
+    wd = SegmentedWavedata.blank(1e-3, 1e9)
+    assert wd.size == 10**6 and wd.nnz == 0 and not wd.isIQ
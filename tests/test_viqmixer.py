@@ -0,0 +1,42 @@
+import numpy as np
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN, DenseWavedataN, vIQmixer
+
+
+def _channels(n=5, size=600, sRate=2e9, seed=0):
+    '''各通道不同包络的IQ波形'''
+    rng = np.random.default_rng(seed)
+    t = (np.arange(size)+0.5)/sRate
+    env = np.exp(-((t-150e-9)/40e-9)**2)
+    amps = rng.standard_normal(n)+1j*rng.standard_normal(n)
+    return amps[:,None]*env, sRate
+
+
+def test_up_conversion_batch_matches_per_channel():
+    IQ, sRate = _channels()
+    LO = np.array([100e6, -50e6, 230e6, 0, 75.3e6])
+    rng = np.random.default_rng(1)
+    cali = np.stack([[[1+0.1*rng.standard_normal(), 0.02*rng.standard_normal(), 10*rng.standard_normal()]
+                      for _ in range(2)] for _ in LO])
+    cali_rf = np.stack([1+0.1*rng.standard_normal(5), 0.01*rng.standard_normal(5)], axis=-1)
+    res = vIQmixer.up_conversion_batch(LO, IQ, sRate, cali, cali_rf)
+    assert isinstance(res, DenseWavedataN) and res.shape == (5,) and res.sRate == sRate
+    for row, f, iq, c, r in zip(res.data, LO, IQ, cali, cali_rf):
+        ref = vIQmixer.up_conversion(f, IQ=Wavedata(iq, sRate), cali_array=c, cali_rf=r)
+        np.testing.assert_allclose(row, ref.data, atol=1e-12)
+    # 不校准时即 Re[IQ*exp(1j*w*t)]
+    t = (np.arange(IQ.shape[-1])+0.5)/sRate
+    plain = vIQmixer.up_conversion_batch(LO, IQ, sRate)
+    np.testing.assert_allclose(plain.data, np.real(IQ*np.exp(2j*np.pi*LO[:,None]*t)), atol=1e-12)
+
+
+def test_up_conversion_batch_ragged_wavedataN():
+    IQ, sRate = _channels(n=3)
+    wds = [Wavedata(iq[:size], sRate) for iq, size in zip(IQ, [600, 450, 520])]
+    cali = [[1.1, 0.03, 5], [0.9, -0.02, -3]]
+    res = vIQmixer.up_conversion_batch([80e6, 120e6, -40e6], WavedataN(wds), cali_array=cali)
+    assert list(res.lengths) == [600, 450, 520]
+    for row, f, wd in zip(res.array, [80e6, 120e6, -40e6], wds):
+        ref = vIQmixer.up_conversion(f, IQ=wd, cali_array=cali)
+        assert row.size == wd.size
+        np.testing.assert_allclose(row.data, ref.data, atol=1e-12)
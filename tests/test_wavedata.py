@@ -0,0 +1,143 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from qulab_toolbox.wavedata import Wavedata, WavedataN, WavedataBuilder
+
+
+def test_timeFunc_cached_and_matches_samples():
+    wd = Wavedata(np.sin(np.arange(50)/5)+0.5j*np.cos(np.arange(50)/7), 1e3)
+    f = wd.timeFunc()
+    assert f is wd.timeFunc() and f is wd.f
+    assert wd.timeFunc('linear') is not f
+    np.testing.assert_allclose(f(wd.x), wd.data, atol=1e-12)
+    np.testing.assert_allclose(wd.timeFunc(cache=False)(wd.x), wd.data, atol=1e-12)
+
+
+def test_timeFunc_registers_one_finalizer_per_waveform():
+    cache = Wavedata.interpCache
+    wds = [Wavedata(np.random.randn(20), 1) for _ in range(cache.maxsize+8)]
+    n0 = len(weakref.finalize._registry)
+    for _ in range(5): # 循环访问超过缓存容量，每次都未命中
+        for wd in wds:
+            wd.timeFunc()
+            wd.timeFunc('linear')
+    assert len(weakref.finalize._registry)-n0 <= len(wds)
+    keys = [id(wd) for wd in wds]
+    del wd, wds
+    gc.collect()
+    assert not any([key in Wavedata._interpKinds for key in keys])
+    assert not any([(key, 'cubic') in cache for key in keys])
+
+
+def test_timeFunc_cache_bounded_by_bytes():
+    cache = Wavedata.interpCache
+    wd = Wavedata(np.zeros(cache.maxbytes//32+1), 1)
+    f = wd.timeFunc('linear')
+    assert (id(wd), 'linear') not in cache
+    assert cache.nbytes <= cache.maxbytes
+    assert f is not wd.timeFunc('linear')
+
+
+def test_builder_matches_concatenate():
+    rng = np.random.default_rng(0)
+    segs = [Wavedata(rng.standard_normal(n), 1e3) for n in (3, 0, 17, 5)]
+    segs.append(Wavedata(rng.standard_normal(4)+1j, 1e3))
+    ref = np.concatenate([wd.data for wd in segs])
+    builder = WavedataBuilder(1e3)
+    for wd in segs:
+        builder |= wd
+    assert builder.size == ref.size and builder.len == ref.size/1e3
+    np.testing.assert_array_equal(builder.build().data, ref)
+    np.testing.assert_array_equal(Wavedata.concat(segs).data, ref)
+    np.testing.assert_array_equal((segs[0]|segs[2]).data, ref[:20])
+    np.testing.assert_array_equal((segs[2]^3).data, np.tile(segs[2].data, 3))
+    assert (segs[2]^0).size == 0
+
+
+def test_builder_many_dtypes():
+    # 多于32个片段时np.result_type在numpy 1.x中会报错，只对不同的dtype求结果类型
+    segs = [Wavedata(np.ones(2, dtype=np.float32), 1) for _ in range(40)]
+    segs.append(Wavedata(np.ones(2, dtype=np.complex64), 1))
+    wd = Wavedata.concat(segs)
+    assert wd.data.dtype == np.complex64 and wd.size == 82
+
+
+def test_crop_returns_readonly_view():
+    data = np.arange(10.)
+    wd = Wavedata(data, 1)
+    for part, ref in [(wd.setRange(2, 7), data[2:7]), (wd.setSize(4), data[:4]),
+                      (wd.setSize(-3), data[-3:]), (wd.setLen(5), data[:5])]:
+        np.testing.assert_array_equal(part.data, ref)
+        assert np.shares_memory(part.data, data)
+        with pytest.raises(ValueError):
+            part.data[0] = 1
+    cp = wd.setRange(2, 7).copy()
+    cp.data[0] = -1
+    assert data[2] == 2
+
+
+@pytest.mark.parametrize('t', [0, 3, -3, 10, -10, 2.4])
+def test_shift_and_pad_match_numpy(t):
+    data = np.arange(1., 11.)
+    wd = Wavedata(data, 1)
+    n = int(np.around(abs(t)))
+    ref = np.zeros(10)
+    if t >= 0:
+        ref[n:] = data[:10-n]
+    else:
+        ref[:10-n] = data[n:]
+    np.testing.assert_array_equal((wd >> t).data, ref)
+    np.testing.assert_array_equal((wd << -t).data, ref)
+    np.testing.assert_array_equal(wd.append(2, 3).data, np.pad(data, (2, 3)))
+    np.testing.assert_array_equal(wd.setSize(13).data, np.pad(data, (0, 3)))
+    with pytest.raises(TypeError):
+        wd >> 11
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.complex64])
+def test_dtype_is_kept(dtype):
+    from qulab_toolbox.wavedata._wd_func import Gaussian, Blank
+    g = Gaussian(1e-7, 1e9, dtype=dtype)
+    ref = Gaussian(1e-7, 1e9)
+    assert g.data.dtype == dtype
+    np.testing.assert_allclose(g.data, ref.data, rtol=1e-6, atol=1e-7)
+    wd = (g+Blank(2e-7, 1e9, dtype=dtype))*g.append(0, 100) >> 1e-8
+    assert wd.data.dtype == dtype
+    assert g.derivative().data.dtype == dtype
+    y = np.pad(ref.data, 1)
+    np.testing.assert_allclose(g.derivative().data, (y[2:]-y[:-2])/2*1e9, rtol=1e-5, atol=1e3)
+
+
+def test_quantize():
+    data = np.array([0, 0.25, -0.5, 1.0, -1.0])
+    codes, info = Wavedata(data, 1).quantize()
+    assert codes.dtype == np.int16 and info['clipped'] == 0 and info['peak'] == 1.0
+    np.testing.assert_array_equal(codes, np.rint(data*32767))
+    codes, info = Wavedata(data, 1).quantize(vmax=0.5, bits=12)
+    np.testing.assert_array_equal(codes, np.clip(np.rint(data*2047/0.5), -2048, 2047))
+    assert info['clipped'] == 2
+    codes, info = Wavedata(data+0.5j*data[::-1], 1).quantize()
+    assert codes.shape == (2, 5)
+    np.testing.assert_array_equal(codes[1], np.rint(0.5*data[::-1]*32767))
+
+
+def test_isIQ_matches_data():
+    real = Wavedata(np.arange(1., 6.), 1)
+    iq = Wavedata(np.arange(1., 6.)*(1+1j), 1)
+    zero_imag = Wavedata(np.arange(1., 6.)+0j, 1)
+    assert not real.isIQ and not real.isComplex
+    assert iq.isIQ and iq.isComplex
+    assert not zero_imag.isIQ and zero_imag.isComplex
+    cases = [0*iq, iq*0, iq+1, 2*iq, -iq, iq*1j, real*1j, real+real, real*iq, iq.I(), iq.setRange(0, 2),
+             iq >> 1, iq.append(1, 1), iq.copy(), real | iq, 0*iq+1j]
+    for wd in cases:
+        assert wd.isIQ == bool(np.any(np.imag(wd.data))), wd.data
+
+
+def test_quantize_after_zero_scaling():
+    iq = Wavedata(np.ones(4)*(1+1j), 1)
+    codes, _ = (0*iq).quantize()
+    assert codes.shape == (4,)